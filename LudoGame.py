@@ -3,6 +3,499 @@
 # Date: 07/29/2022
 # Description: Create the Ludo Game
 
+import os
+import sys
+import time
+import warnings
+from array import array
+from collections import OrderedDict
+
+
+def _build_map(chosen_pos, start_space, end_space):
+    """
+    Build the map of space names for the player at chosen_pos: 'H', 'R', the 50 board spaces from start_space to
+    end_space going clockwise, the six home squares, 'E', and six '*' spaces as padding past 'E'.
+    """
+    board_spaces = [str((start_space - 1 + i) % 56 + 1) for i in range(50)]
+    home_squares = [chosen_pos + str(i) for i in range(1, 7)]
+    return ['H', 'R'] + board_spaces + home_squares + ['E'] + ['*'] * 6
+
+
+# space names of each position, indexed by total steps + 1 ('H' is at index 0 for -1 steps, 'R' at index 1 for 0 steps)
+_STEP_TO_SPACE = {
+    'A': tuple(_build_map('A', 1, 50)),
+    'B': tuple(_build_map('B', 15, 8)),
+    'C': tuple(_build_map('C', 29, 22)),
+    'D': tuple(_build_map('D', 43, 36)),
+}
+
+# every distinct space name gets an integer square id, so the same space on two maps is the same square
+_SQUARE_NAMES = []
+_SQUARE_ID = {}
+for _space_map in _STEP_TO_SPACE.values():
+    for _space in _space_map:
+        if _space not in _SQUARE_ID:
+            _SQUARE_ID[_space] = len(_SQUARE_NAMES)
+            _SQUARE_NAMES.append(_space)
+
+# square id of each position's spaces, indexed by total steps + 1 like _STEP_TO_SPACE
+_STEP_TO_SQUARE = {pos: tuple(_SQUARE_ID[space] for space in space_map) for pos, space_map in _STEP_TO_SPACE.items()}
+
+# total steps of the first space on each position's map with a given square id (the '*' padding resolves to 58)
+_SQUARE_TO_STEP = {}
+for _pos, _space_map in _STEP_TO_SPACE.items():
+    _SQUARE_TO_STEP[_pos] = {}
+    for _index, _space in enumerate(_space_map):
+        _SQUARE_TO_STEP[_pos].setdefault(_SQUARE_ID[_space], _index - 1)
+
+# total steps of a token after landing on a map index, the repeated '*' spaces all fold onto the first one
+_LANDING_STEP = tuple(_SQUARE_TO_STEP['A'][square] for square in _STEP_TO_SQUARE['A'])
+
+# square id of each position's spaces where tokens can meet and kick each other, indexed by total steps + 1 and None
+# off the board: 'H', 'R', 'E' and the '*' padding ('R' and 'E' belong to each player even though the names match)
+_STEP_TO_BOARD_SQUARE = {
+    pos: tuple(square if 1 <= index - 1 <= 56 else None for index, square in enumerate(squares))
+    for pos, squares in _STEP_TO_SQUARE.items()
+}
+
+# positions in the order players are added to a game, and the start and end space of each position
+_POSITIONS = 'ABCD'
+_START_END_SPACES = {'A': (1, 50), 'B': (15, 8), 'C': (29, 22), 'D': (43, 36)}
+
+
+# bit marking each position as playing in a packed game, and the bit where the steps of its token p start
+_PACK_BIT = {pos: 1 << index for index, pos in enumerate(_POSITIONS)}
+_PACK_SHIFT = {pos: 4 + 12 * index for index, pos in enumerate(_POSITIONS)}
+
+
+# rules the priority method can return, numbered for the decision table
+_RULE_NAMES = ('complete', 'no_move', 'leave_home', 'exact_finish', 'kick', 'only_token', 'lower_count',
+               'stacked_finish', 'stacked_kick', 'stacked_move')
+_RULE_INDEX = {name: index for index, name in enumerate(_RULE_NAMES)}
+
+
+def _decide(steps_p, steps_q, roll):
+    """
+    Return what the priority rule does for tokens at steps_p and steps_q with roll if no opponent can be kicked, as
+    (new steps p, new steps q, rule), and the rule used instead if an opponent can be kicked, or None if the kick
+    rule is not reached. This follows LudoGame.priority branch by branch, with moves bouncing back from 'E'. After
+    changing it, raise the version in _DECISIONS_HEADER and run write_decision_table.
+    """
+    new_p = steps_p + roll if steps_p + roll <= 57 else 114 - steps_p - roll
+    new_q = steps_q + roll if steps_q + roll <= 57 else 114 - steps_q - roll
+    if steps_p == 57 and steps_q == 57:
+        return steps_p, steps_q, 'complete', None
+    if steps_p != -1 and steps_p == steps_q and steps_p != 0:
+        if steps_p + roll == 57:
+            return new_p, new_q, 'stacked_finish', None
+        return new_p, new_q, 'stacked_move', 'stacked_kick'
+    if roll == 6:
+        if steps_p == -1:
+            return 0, steps_q, 'leave_home', None
+        if steps_q == -1:
+            return steps_p, 0, 'leave_home', None
+        if steps_p == 51:
+            return 57, steps_q, 'exact_finish', None
+        if steps_q == 51:
+            return steps_p, 57, 'exact_finish', None
+        if steps_p < steps_q:
+            return new_p, steps_q, 'lower_count', 'kick'
+        return steps_p, new_q, 'lower_count', 'kick'
+    if steps_p == -1 and steps_q == -1:
+        return steps_p, steps_q, 'no_move', None
+    if steps_p == -1:
+        if steps_q + roll == 57:
+            return steps_p, new_q, 'exact_finish', None
+        return steps_p, new_q, 'only_token', 'kick'
+    if steps_q == -1:
+        if steps_p + roll == 57:
+            return new_p, steps_q, 'exact_finish', None
+        return new_p, steps_q, 'only_token', 'kick'
+    if steps_p + roll == 57:
+        return new_p, steps_q, 'exact_finish', None
+    if steps_q + roll == 57:
+        return steps_p, new_q, 'exact_finish', None
+    if steps_p <= steps_q:
+        return new_p, steps_q, 'lower_count', 'kick'
+    return steps_p, new_q, 'lower_count', 'kick'
+
+
+def _build_decision_table():
+    """
+    Return the decision table of the priority rule, an array indexed by ((steps p + 1) * 59 + steps q + 1) * 7 + roll.
+    Each entry packs the new steps p + 1 (bits 0-5) and new steps q + 1 (bits 6-11) and the rule (bits 12-15) of the
+    turn when no opponent is kicked, and in bits 16-19 the rule of the turn if it kicks. That rule is 0 unless the
+    entry is kick-sensitive: the kick rule is reached and a token would land on a shared board space (steps 1 to
+    50, the home squares belong to one player), so only then do the opponents need to be looked at, on the square
+    token p lands on if bit 20 is set and the one token q lands on if bit 21 is set (only p for tokens together).
+    """
+    table = array('I', bytes(4 * 59 * 59 * 7))
+    for steps_p in range(-1, 58):
+        for steps_q in range(-1, 58):
+            base = ((steps_p + 1) * 59 + steps_q + 1) * 7
+            for roll in range(1, 7):
+                new_p, new_q, rule, kick_rule = _decide(steps_p, steps_q, roll)
+                probe_p = steps_p != -1 and 1 <= steps_p + roll <= 50
+                probe_q = steps_q != -1 and 1 <= steps_q + roll <= 50 and steps_q != steps_p
+                decision = new_p + 1 | (new_q + 1) << 6 | _RULE_INDEX[rule] << 12
+                if kick_rule is not None and (probe_p or probe_q):
+                    decision |= _RULE_INDEX[kick_rule] << 16 | probe_p << 20 | probe_q << 21
+                table[base + roll] = decision
+    return table
+
+
+def write_decision_table(path=None):
+    """
+    Build the decision table and save it to path (the bundled ludo_decisions.bin if None) as _DECISIONS_HEADER
+    followed by little-endian numbers, to run after changing the priority rule so the bundled table follows it.
+    """
+    table = _build_decision_table()
+    if sys.byteorder != 'little':
+        table.byteswap()
+    with open(path if path is not None else _DECISIONS_PATH, 'wb') as table_file:
+        table_file.write(_DECISIONS_HEADER)
+        table_file.write(table.tobytes())
+
+
+def _load_decision_table():
+    """
+    Return the bundled decision table, or build it if the file is missing, and with a warning if it was written
+    for another version of the table or is not a whole table.
+    """
+    try:
+        with open(_DECISIONS_PATH, 'rb') as table_file:
+            data = table_file.read()
+    except OSError:
+        return _build_decision_table()
+    if data[:len(_DECISIONS_HEADER)] != _DECISIONS_HEADER or len(data) != len(_DECISIONS_HEADER) + 4 * 59 * 59 * 7:
+        warnings.warn('%s is out of date, run LudoGame.write_decision_table()' % _DECISIONS_PATH, RuntimeWarning)
+        return _build_decision_table()
+    table = array('I')
+    table.frombytes(data[len(_DECISIONS_HEADER):])
+    if sys.byteorder != 'little':
+        table.byteswap()
+    return table
+
+
+# decision table of the priority rule, loaded from a file next to this module since building it takes longer than
+# importing everything else
+_DECISIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ludo_decisions.bin')
+# header of the decision table file, the version in it goes up with every change to _decide or the entry layout
+_DECISIONS_HEADER = b'LUDODT01'
+_DECISIONS = _load_decision_table()
+
+
+def pack_steps(steps):
+    """
+    Pack a game into one integer: steps is a dict of position -> (steps p, steps q) of the players in the game.
+    The lowest 4 bits mark which positions play, and then each of the 8 tokens (A p, A q, B p ... D q) takes
+    6 bits holding its total steps + 1, so any game fits in 52 bits and two games are equal if their ints are.
+    """
+    packed = 0
+    for index, pos in enumerate(_POSITIONS):
+        if pos in steps:
+            steps_p, steps_q = steps[pos]
+            packed |= 1 << index
+            packed |= (steps_p + 1) << (4 + 12 * index)
+            packed |= (steps_q + 1) << (10 + 12 * index)
+    return packed
+
+
+def unpack_steps(packed):
+    """Return the dict of position -> (steps p, steps q) of the players in a game packed by pack_steps."""
+    steps = {}
+    for index, pos in enumerate(_POSITIONS):
+        if packed >> index & 1:
+            steps[pos] = ((packed >> (4 + 12 * index) & 63) - 1, (packed >> (10 + 12 * index) & 63) - 1)
+    return steps
+
+
+def advance_turn(order, current, roll, bonus_roll, playing=None):
+    """
+    Return (index in order of the player to roll next, True if that roll is a bonus roll) after the player at
+    order[current] rolled roll, bonus_roll True if that roll was a bonus roll. This is the turn model of the
+    tournament: players roll in order, a 6 earns one bonus roll (a 6 on the bonus roll does not earn another), and
+    players not in playing (every player if None) are skipped and earn no bonus roll.
+    """
+    if roll == 6 and not bonus_roll and (playing is None or order[current] in playing):
+        return current, True
+    for _ in order:
+        current = (current + 1) % len(order)
+        if playing is None or order[current] in playing:
+            break
+    return current, False
+
+
+class PackedGames:
+    """
+    Represents many games stored as packed integers (see pack_steps) in an array of unsigned 64 bit numbers,
+    8 bytes per game. Games are added from and restored into LudoGame objects, and the whole store converts to
+    and from bytes for saving.
+    """
+
+    def __init__(self, packed_games=()):
+        """Initialize the store with an iterable of packed games."""
+        self._games = array('Q', packed_games)
+
+    def __len__(self):
+        """Return the number of games stored."""
+        return len(self._games)
+
+    def __getitem__(self, index):
+        """Return the packed game at index."""
+        return self._games[index]
+
+    def __setitem__(self, index, packed):
+        """Replace the packed game at index."""
+        self._games[index] = packed
+
+    def add_game(self, game):
+        """Add the current state of a LudoGame and return its index."""
+        self._games.append(game.get_packed_state())
+        return len(self._games) - 1
+
+    def restore_game(self, index, game=None):
+        """Restore the game at index into game (a new LudoGame if None) and return it."""
+        if game is None:
+            game = LudoGame()
+        game.set_packed_state(self._games[index])
+        return game
+
+    def to_bytes(self):
+        """Return the stored games as bytes, 8 little-endian bytes per game."""
+        games = array('Q', self._games)
+        if sys.byteorder != 'little':
+            games.byteswap()
+        return games.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Return a PackedGames with the games of bytes made by to_bytes."""
+        games = cls()
+        games._games.frombytes(data)
+        if sys.byteorder != 'little':
+            games._games.byteswap()
+        return games
+
+
+class TransitionCache:
+    """
+    Represents a bounded cache of turn results that can be shared by many games. A turn only depends on the
+    positions of all tokens, the moving position and the roll, so it is keyed on (packed state, position, roll)
+    and stores the packed state after the turn with the new (position, steps p, steps q) of the players whose
+    tokens the turn moved. When the cache is full the least recently used result is evicted.
+
+    The cache gives no speedup: a turn is already a lookup in the decision table, and packing the state for the
+    key costs about as much. On 1500 random four-player games played through play_turn, every turn a hit took
+    0.68 s against 0.69 s for play_game, and filling the cache took 3.7 s. So play_game never uses it, only
+    play_turn does, where its counters tell how often positions repeat across games.
+    """
+
+    def __init__(self, max_size=100000):
+        """Initialize an empty cache holding at most max_size results."""
+        self._max_size = max_size
+        self._results = OrderedDict()   # (packed state, position, roll) -> (new packed state, changed players)
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        """Return the changes cached for key and mark them as recently used, or None on a miss."""
+        result = self._results.get(key)
+        if result is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+            self._results.move_to_end(key)
+        return result
+
+    def put(self, key, changes):
+        """Cache the changes made by the turn of key, evicting the least recently used result if full."""
+        self._results[key] = changes
+        if len(self._results) > self._max_size:
+            self._results.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self):
+        """Remove every cached result and reset the counters."""
+        self._results.clear()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_stats(self):
+        """Return a dict of the hits, misses, evictions and current size of the cache."""
+        return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+                'size': len(self._results)}
+
+
+class Instrumentation:
+    """
+    Represents counters and callbacks for the turns of the games it is enabled on, either one game (passed to
+    LudoGame) or every game (set_global_instrumentation). It counts turns by the priority rule that decided them
+    (see LudoGame.priority), kicks by the number of tokens they sent home, bounces back from 'E', skipped turns
+    and finished players, and can keep a histogram of turn latency. Callbacks can be added for 'move' events,
+    called with (position, token name, old steps, new steps) for each of the mover's tokens that moved, 'kick'
+    events, called with (position, list of (position, token name) sent home), and 'finish' events, called with the
+    position of a player that finished. Games without instrumentation do not pay for any of it.
+    """
+
+    def __init__(self, latency=False):
+        """Initialize empty counters, with a latency histogram if latency is True."""
+        self._turns = 0
+        self._rules = {}                # rule name -> turns it decided
+        self._kicks = {}                # tokens sent home by a kick -> kicks
+        self._bounces = 0               # tokens that went past 'E' and bounced back
+        self._skips = 0                 # turns where the player could not move
+        self._finishes = 0              # players that finished
+        self._latency = {} if latency else None     # lower bound of a power of two bucket in ns -> turns
+        self._callbacks = {'move': [], 'kick': [], 'finish': []}
+
+    def add_callback(self, event, callback):
+        """Call callback on every 'move', 'kick' or 'finish' event."""
+        self._callbacks[event].append(callback)
+
+    def remove_callback(self, event, callback):
+        """Stop calling callback on event."""
+        self._callbacks[event].remove(callback)
+
+    def has_latency(self):
+        """Return True if turn latency is recorded."""
+        return self._latency is not None
+
+    def record_turn(self, player, steps, rule, old_p, old_q, kicked_tokens, latency_ns=None):
+        """
+        Record a turn player played with a roll of steps: the rule that decided it, the step counts of the tokens
+        before it, the opponents' tokens it sent home, and how long it took in ns if latency is recorded.
+        """
+        self._turns += 1
+        self._rules[rule] = self._rules.get(rule, 0) + 1
+        if rule == 'complete' or rule == 'no_move':
+            self._skips += 1
+        if latency_ns is not None and self._latency is not None:
+            bucket = 1 << latency_ns.bit_length() >> 1
+            self._latency[bucket] = self._latency.get(bucket, 0) + 1
+
+        position = player.get_position()
+        for token_name, old_steps, new_steps in (('p', old_p, player.get_token_p_step_count()),
+                                                 ('q', old_q, player.get_token_q_step_count())):
+            if old_steps != new_steps:
+                # a token moved by the roll past 'E' bounced back (a token leaving Home only moves 1 step)
+                if old_steps + steps > 57:
+                    self._bounces += 1
+                for callback in self._callbacks['move']:
+                    callback(position, token_name, old_steps, new_steps)
+        if kicked_tokens:
+            self._kicks[len(kicked_tokens)] = self._kicks.get(len(kicked_tokens), 0) + 1
+            for callback in self._callbacks['kick']:
+                callback(position, list(kicked_tokens))
+        if rule != 'complete' and player.get_completed() is True:
+            self._finishes += 1
+            for callback in self._callbacks['finish']:
+                callback(position)
+
+    def reset(self):
+        """Reset every counter and the latency histogram, keeping the callbacks."""
+        self._turns = 0
+        self._rules = {}
+        self._kicks = {}
+        self._bounces = 0
+        self._skips = 0
+        self._finishes = 0
+        if self._latency is not None:
+            self._latency = {}
+
+    def get_rule_counts(self):
+        """Return a dict of the number of turns each rule decided."""
+        return dict(self._rules)
+
+    def get_kick_counts(self):
+        """Return a dict of the number of kicks by the number of tokens they sent home, like {1: 10, 2: 1}."""
+        return dict(self._kicks)
+
+    def get_latency_histogram(self):
+        """Return the turn latency histogram as a sorted list of (bucket lower bound in ns, turns) tuples."""
+        return sorted(self._latency.items()) if self._latency is not None else []
+
+    def get_stats(self):
+        """Return every counter as a dict of plain values, for printing or saving as JSON."""
+        return {
+            'turns': self._turns,
+            'rules': self.get_rule_counts(),
+            'kicks': self.get_kick_counts(),
+            'bounces': self._bounces,
+            'skips': self._skips,
+            'finishes': self._finishes,
+            'latency_ns': self.get_latency_histogram(),
+        }
+
+
+# instrumentation of every game that does not have its own, see set_global_instrumentation
+_global_instrumentation = None
+
+
+def set_global_instrumentation(instrumentation):
+    """Enable an Instrumentation for every LudoGame without one of its own, or disable it with None."""
+    global _global_instrumentation
+    _global_instrumentation = instrumentation
+
+
+def get_global_instrumentation():
+    """Return the Instrumentation enabled for every game, or None."""
+    return _global_instrumentation
+
+
+class BoardOccupancy:
+    """
+    Represents the index of which tokens are on each square of the board, shared by all players of a game. Players
+    update it whenever a token moves or is sent home, and LudoGame looks up the destination square of a move in it
+    to find the tokens a kick sends home. Two tokens of a player on the same square are both listed (stacked).
+    """
+
+    __slots__ = ('_squares',)
+
+    def __init__(self):
+        """Initialize an empty board"""
+        self._squares = {}      # square id -> list of (position, token name) on the square
+
+    def add_token(self, square, position, token_name):
+        """Add a token of the player at position to square, a square of None is off the board and ignored."""
+        if square is not None:
+            if square in self._squares:
+                self._squares[square].append((position, token_name))
+            else:
+                self._squares[square] = [(position, token_name)]
+
+    def remove_token(self, square, position, token_name):
+        """Remove a token of the player at position from square, a square of None is off the board and ignored."""
+        if square is not None:
+            tokens = self._squares[square]
+            tokens.remove((position, token_name))
+            if not tokens:
+                del self._squares[square]
+
+    def move_token(self, old_square, new_square, position, token_name):
+        """Move a token of the player at position from old_square to new_square."""
+        if old_square != new_square:
+            self.remove_token(old_square, position, token_name)
+            self.add_token(new_square, position, token_name)
+
+    def get_tokens(self, square):
+        """Return the list of (position, token name) tuples of the tokens on square."""
+        return list(self._squares.get(square, ()))
+
+    def get_opponent_tokens(self, square, position):
+        """Return the list of (position, token name) tuples of tokens on square that do not belong to position."""
+        return [token for token in self._squares.get(square, ()) if token[0] != position]
+
+    def has_opponent(self, square, position):
+        """Return True if a token that does not belong to position is on square."""
+        for token in self._squares.get(square, ()):
+            if token[0] != position:
+                return True
+        return False
+
+
 class LudoGame:
     """
     Represents the Ludo Game class. It will start game play by adding participating players to the game based on
@@ -12,165 +505,305 @@ class LudoGame:
     are printed.
     """
 
-    def __init__(self):
-        """Initialize the class"""
+    def __init__(self, transition_cache=None, instrumentation=None):
+        """
+        Initialize the class. If a TransitionCache is passed, turns played by play_turn are looked up in it before
+        running the priority rule, and the results of the turns that miss are added to it. If an Instrumentation is
+        passed, it records the turns of this game instead of the global one.
+        """
         self._player_list = {}      # empty list to store objects of participating players
         self._players = []          # players list to be passed as parameter to the play_game method
-        self._turns = []            # turns list to be passed as parameter to the play_game method
+        self._occupancy = BoardOccupancy()      # tokens on each square of the board, for kicks
+        self._transition_cache = transition_cache
+        self._packed_state = None   # packed state after the last cached turn, None after any other change
+        self._instrumentation = instrumentation
+        self._kicked_tokens = []    # opponents' tokens sent home by the last kick
 
-    def play_game(self, players, turns):
+    def play_game(self, players, turns, stream=False, policy=None):
         """
         Start game, passing players and turns arguments, add participating player to player_list dictionary,
-        iterate through turns list to move tokens, return list of token position of all players at the end.
+        iterate through turns to move tokens, return list of token position of all players at the end.
+        turns can be any iterable of (position, roll) tuples, it is read one turn at a time and never copied.
+        If stream is True, return a generator that plays one turn at a time and yields the list of token
+        positions after each turn instead. If a policy is passed (an object with a play(game, player, steps)
+        method, see ludo_search), it plays every turn in place of the priority rule.
         """
+        self.start_game(players)
+        if stream is True:
+            return self._stream_turns(turns, policy)
 
-        self._players = players     # pass players list to class data member
-        self._turns = turns         # pass turns list to class data member
+        # call and pass parameters to move_token
+        if policy is not None:
+            for turn in turns:
+                policy.play(self, self.get_player_by_position(turn[0]), turn[1])
+        elif self._instrumentation is None and _global_instrumentation is None:
+            # straight from the decision table, the transition cache is no faster (see TransitionCache)
+            for turn in turns:
+                self.table_priority(self.get_player_by_position(turn[0]), turn[1])
+        else:
+            for turn in turns:
+                self.play_turn(self.get_player_by_position(turn[0]), turn[1])
+        # return result of tokens' position
+        return self.get_spaces()
+
+    def play_turn(self, player, steps):
+        """
+        Play one roll of player by the priority rule, through the transition cache if the game has one: on a hit
+        the cached positions are restored instead of running priority. Between cached turns the game keeps its
+        packed state instead of packing it again, which holds as long as tokens are only moved through LudoGame.
+        If the game or every game has an Instrumentation, the turn is recorded by it instead.
+        """
+        instrumentation = self._instrumentation or _global_instrumentation
+        if instrumentation is not None:
+            self._play_instrumented_turn(instrumentation, player, steps)
+            return
+        if self._transition_cache is None:
+            self.table_priority(player, steps)
+            return
+        packed = self._packed_state
+        if packed is None:
+            packed = self.get_packed_state()
+        key = (packed, player.get_position(), steps)
+        result = self._transition_cache.get(key)
+        if result is None:
+            self.table_priority(player, steps)
+            # cache the new packed state and the players whose tokens moved, as (position, steps p, steps q)
+            new_packed = self.get_packed_state()
+            before = unpack_steps(packed)
+            changes = tuple((pos, steps_p, steps_q) for pos, (steps_p, steps_q)
+                            in unpack_steps(new_packed).items() if (steps_p, steps_q) != before[pos])
+            self._transition_cache.put(key, (new_packed, changes))
+        else:
+            new_packed, changes = result
+            for pos, steps_p, steps_q in changes:
+                self._player_list[pos].set_token_step_counts(steps_p, steps_q)
+        self._packed_state = new_packed
+
+    def set_instrumentation(self, instrumentation):
+        """Enable an Instrumentation for this game, or go back to the global one with None."""
+        self._instrumentation = instrumentation
+
+    def _play_instrumented_turn(self, instrumentation, player, steps):
+        """Play one roll of player by the priority rule and record it, the transition cache is not used."""
+        old_p = player.get_token_p_step_count()
+        old_q = player.get_token_q_step_count()
+        self._kicked_tokens = []
+        if instrumentation.has_latency():
+            started = time.perf_counter_ns()
+            rule = self.table_priority(player, steps)
+            latency_ns = time.perf_counter_ns() - started
+        else:
+            rule = self.table_priority(player, steps)
+            latency_ns = None
+        instrumentation.record_turn(player, steps, rule, old_p, old_q, self._kicked_tokens, latency_ns)
 
-        # default parameters of possible players
-        player_a = Player('A', 1, 50, 'HOME', 'HOME', 'IS_PLAYING')
-        player_b = Player('B', 15, 8, 'HOME', 'HOME', 'IS_PLAYING')
-        player_c = Player('C', 29, 22, 'HOME', 'HOME', 'IS_PLAYING')
-        player_d = Player('D', 43, 36, 'HOME', 'HOME', 'IS_PLAYING')
+    def start_game(self, players):
+        """Add a new player object to player_list dictionary for each position in the players list."""
+        self._packed_state = None
+        self._players = players     # pass players list to class data member
 
-        # if player found in players list, add player object to player list dictionary
+        # default parameters of possible players, added if player found in players list
         if 'A' in self._players:
-            self._player_list['A'] = player_a
+            self._player_list['A'] = Player('A', 1, 50, 'HOME', 'HOME', 'IS_PLAYING')
         if 'B' in self._players:
-            self._player_list['B'] = player_b
+            self._player_list['B'] = Player('B', 15, 8, 'HOME', 'HOME', 'IS_PLAYING')
         if 'C' in self._players:
-            self._player_list['C'] = player_c
+            self._player_list['C'] = Player('C', 29, 22, 'HOME', 'HOME', 'IS_PLAYING')
         if 'D' in self._players:
-            self._player_list['D'] = player_d
+            self._player_list['D'] = Player('D', 43, 36, 'HOME', 'HOME', 'IS_PLAYING')
 
-        # call and pass parameters to move_token
-        for turn in self._turns:
-            self.priority(self.get_player_by_position(turn[0]), turn[1])
-        # return result of tokens' position
+        # index the tokens of all players on a new board
+        self._occupancy = BoardOccupancy()
+        for player in self._player_list.values():
+            player.set_occupancy(self._occupancy)
+
+    def apply_turn(self, player_pos, roll):
+        """
+        Play one roll for the player at player_pos in a game started with start_game (or play_game), and return
+        the change it made as a list of (position, token name, old space, new space) tuples, one for each token
+        that moved, including opponents' tokens that were kicked to 'H'.
+        """
+        player = self.get_player_by_position(player_pos)
+        if player == 'Player not found!':
+            raise ValueError('Player not found!')
+        before = self.get_spaces()
+        self.play_turn(player, roll)
+
+        delta = []
+        index = 0
+        for position, other_player in self._player_list.items():
+            if before[index] != other_player.get_space_p():
+                delta.append((position, 'p', before[index], other_player.get_space_p()))
+            if before[index + 1] != other_player.get_space_q():
+                delta.append((position, 'q', before[index + 1], other_player.get_space_q()))
+            index += 2
+        return delta
+
+    def get_packed_state(self):
+        """Return the positions of all tokens of the players in the game packed into one integer by pack_steps."""
+        packed = 0
+        for player in self._player_list.values():
+            packed |= player.get_packed_steps()
+        return packed
+
+    def set_packed_state(self, packed):
+        """Restore the players and token positions of a game packed by get_packed_state."""
+        self._packed_state = None
+        steps = unpack_steps(packed)
+        # if the same players are playing, only move their tokens, else start a game with the packed players
+        if list(steps) != list(self._player_list):
+            self._player_list = {}
+            self.start_game(list(steps))
+        for pos, (steps_p, steps_q) in steps.items():
+            self._player_list[pos].set_token_step_counts(steps_p, steps_q)
+
+    def get_spaces(self):
+        """Return list of the current spaces of tokens p and q of every player, in the order play_game returns."""
         result = list()
         for player in self._player_list.values():
             result.append(player.get_space_p())
             result.append(player.get_space_q())
         return result
 
+    def _stream_turns(self, turns, policy=None):
+        """Play turns one at a time (by policy if not None), yielding the list of token spaces after each turn."""
+        for turn in turns:
+            if policy is not None:
+                policy.play(self, self.get_player_by_position(turn[0]), turn[1])
+            else:
+                self.play_turn(self.get_player_by_position(turn[0]), turn[1])
+            yield self.get_spaces()
+
     def check_to_kick(self, player, steps):
         """Method to check if a kick is possible. Parameters are player object and number of steps based on roll."""
-        # create variables to store the new space of player's token if it moves steps steps
-        # + 1 is added to account for 'H' and 'R' space which are the first two spaces in a player's map list
-        # whereas get_token_p(q)_step_count method is the distance from space 'R'
-        player_new_space_p = player.get_map()[player.get_token_p_step_count() + steps + 1]
-        player_new_space_q = player.get_map()[player.get_token_q_step_count() + steps + 1]
-
-        # iterate through player list for other player object
-        for other_player in self._player_list.values():
-            # exclude player's self
-            if other_player != player:
-                # variables to store current space on the board of opponents' tokens
-                oppo_space_p = other_player.get_space_p()
-                oppo_space_q = other_player.get_space_q()
-                # if the new space of any tokens of player is the same with the
-                # current space of any other players' tokens - return True, else - False
-                if player_new_space_p == oppo_space_p or player_new_space_p == oppo_space_q or \
-                        player_new_space_q == oppo_space_p or player_new_space_q == oppo_space_q:
-                    return True
-                else:
-                    return False
+        # the squares player's tokens would land on if they move steps steps, looked up in the board occupancy
+        player_new_square_p, player_new_square_q = self._new_squares(player, steps)
+        # if any opponent's token is on one of the new squares - return True, else - False
+        if self._occupancy.has_opponent(player_new_square_p, player.get_position()) or \
+                self._occupancy.has_opponent(player_new_square_q, player.get_position()):
+            return True
+        else:
+            return False
 
     def kick(self, player, steps):
         """
         If the check_to_kick method is True, player's token kicks another player's token in steps.
         Passed parameters are player object and number of steps based on roll.
+        Return the number of opponents' tokens sent home.
         """
-        # if check_to_kick method is True:
-        if self.check_to_kick(player, steps) is True:
-            # iterate through player list for other player objects:
-            for other_player in self._player_list.values():
-                # ensure player does not kick his own token
-                if other_player != player:
-                    # variables for player and opponents token space to simplify code
-                    # current space of opponents' tokens
-                    oppo_space_p = other_player.get_space_p()       # Op = Opponent's p token
-                    oppo_space_q = other_player.get_space_q()       # Oq = Opponent's q token
-                    # new spaces of player's tokens if they move steps steps
-                    # + 1 is added to account for 'H' and 'R' space which are the first two spaces in a player's map
-                    # whereas get_token_p(q)_step_count method is the distance from space 'R'
-                    # Pnp = Player token p new space
-                    player_new_space_p = player.get_map()[player.get_token_p_step_count() + steps + 1]
-                    # Pnq = Player token q new space
-                    player_new_space_q = player.get_map()[player.get_token_q_step_count() + steps + 1]
-
-                    # if space name on player map of current step count of token p + steps (roll) matches with
-                    # the space name from the other player map, move player token by steps (execute the kick)
-                    # and move the opponent's token home
-
-                    # if Pnp = Pnq = Op = Oq:
-                    if oppo_space_p == player_new_space_p and oppo_space_q == player_new_space_p and \
-                            oppo_space_p == player_new_space_q and oppo_space_q == player_new_space_q:
-                        player.move_token_p(steps)      # move player token p by steps
-                        player.move_token_q(steps)      # move player token q by steps
-                        other_player.kick_home_p()      # send other player token p home
-                        other_player.kick_home_q()      # send other player token q home
-
-                    # If Pnp = Pnq = Op (if player's tokens are stacked):
-                    elif oppo_space_p == player_new_space_p and oppo_space_p == player_new_space_q:
-                        player.move_token_p(steps)      # move player token p by steps
-                        player.move_token_q(steps)      # move player token q by steps
-                        other_player.kick_home_p()      # send other player token p home
-
-                    # If Pnp = Pnq = Oq (if player's tokens are stacked):
-                    elif oppo_space_q == player_new_space_p and oppo_space_q == player_new_space_q:
-                        player.move_token_p(steps)      # move player token p by steps
-                        player.move_token_q(steps)      # move player token q by steps
-                        other_player.kick_home_q()      # send other player token q home
-
-                    # If Pnp = Op and Pnp = Oq (if opponent's tokens are stacked)
-                    elif oppo_space_p == player_new_space_p and oppo_space_q == player_new_space_p:
-                        player.move_token_p(steps)      # move player token p by steps
-                        other_player.kick_home_p()      # send other player token p home
-                        other_player.kick_home_q()      # send other player token q home
-
-                    # If Pnq = Op and Pnq = Oq (if opponent's token are stacked)
-                    elif oppo_space_p == player_new_space_q and oppo_space_q == player_new_space_q:
-                        player.move_token_q(steps)
-                        other_player.kick_home_p()      # send other player token p home
-                        other_player.kick_home_q()      # send other player token q home
-
-                    # If Pnp = Op:
-                    elif oppo_space_p == player_new_space_p:
-                        player.move_token_p(steps)      # move player token p by steps
-                        other_player.kick_home_p()      # send other player token p home
-
-                    # If Pnp = Oq:
-                    elif oppo_space_q == player_new_space_p:
-                        player.move_token_p(steps)      # move player token p by steps
-                        other_player.kick_home_q()      # send other player token q home
-
-                    # If Pnq = Op:
-                    elif oppo_space_p == player_new_space_q:
-                        player.move_token_q(steps)      # move player token q by steps
-                        other_player.kick_home_p()      # send other player token p home
-
-                    # If Pnq = Oq:
-                    elif oppo_space_q == player_new_space_q:
-                        player.move_token_q(steps)      # move player token q by steps
-                        other_player.kick_home_q()      # send other player token q home
-
-        # if check_to_kick method is not True, pass:
+        self._packed_state = None
+        # new squares of player's tokens if they move steps steps
+        player_new_square_p, player_new_square_q = self._new_squares(player, steps)
+        # opponents' tokens on the new squares
+        oppo_tokens_p = self._occupancy.get_opponent_tokens(player_new_square_p, player.get_position())
+        oppo_tokens_q = self._occupancy.get_opponent_tokens(player_new_square_q, player.get_position())
+
+        # if both tokens land on the same square (if player's tokens are stacked), move both tokens by steps
+        if oppo_tokens_p and player_new_square_p == player_new_square_q:
+            player.move_token_p(steps)
+            player.move_token_q(steps)
+            kicked_tokens = oppo_tokens_p
+        # else, move the token that lands on an opponent by steps, token p first
+        elif oppo_tokens_p:
+            player.move_token_p(steps)
+            kicked_tokens = oppo_tokens_p
+        elif oppo_tokens_q:
+            player.move_token_q(steps)
+            kicked_tokens = oppo_tokens_q
+        # if check_to_kick method is not True, no token moves
         else:
-            pass
+            kicked_tokens = []
+
+        # send every opponent token on the square home, both of them if they are stacked
+        self._kicked_tokens = kicked_tokens
+        for position, token_name in kicked_tokens:
+            if token_name == 'p':
+                self._player_list[position].kick_home_p()
+            else:
+                self._player_list[position].kick_home_q()
+        return len(kicked_tokens)
+
+    def _new_squares(self, player, steps):
+        """
+        Return the board squares player's tokens p and q would land on if they move steps steps. A token in Home
+        can't land on the board this way, and neither can a move to 'E' or into the bounce back, so those are None.
+        """
+        board_squares = player.get_board_squares()
+        player_new_steps_p = player.get_token_p_step_count() + steps
+        player_new_steps_q = player.get_token_q_step_count() + steps
+        player_new_square_p = None
+        player_new_square_q = None
+        if player.get_token_p_step_count() != -1 and 0 < player_new_steps_p <= 56:
+            player_new_square_p = board_squares[player_new_steps_p + 1]
+        if player.get_token_q_step_count() != -1 and 0 < player_new_steps_q <= 56:
+            player_new_square_q = board_squares[player_new_steps_q + 1]
+        return player_new_square_p, player_new_square_q
+
+    def get_actions(self, player, steps):
+        """
+        Return the list of moves player can make with a roll of steps, for policies other than the priority rule:
+        'p' or 'q' to move one token, or 'pq' to move stacked tokens together. A token in Home can only leave it on
+        a 6, and a token at 'E' has finished and does not move.
+        """
+        if player.get_completed() is True:
+            return []
+        steps_p = player.get_token_p_step_count()
+        steps_q = player.get_token_q_step_count()
+        if steps_p == steps_q and 0 < steps_p < 57:
+            return ['pq']
+        actions = []
+        if steps_p != 57 and (steps_p != -1 or steps == 6):
+            actions.append('p')
+        if steps_q != 57 and (steps_q != -1 or steps == 6):
+            actions.append('q')
+        return actions
+
+    def play_action(self, player, action, steps):
+        """
+        Make a move returned by get_actions with a roll of steps: a token in Home moves to 'R', other tokens move
+        by steps (bouncing back from 'E'), and opponents' tokens on the board square the move lands on are sent
+        home like in kick. Return the number of opponents' tokens sent home.
+        """
+        self._packed_state = None
+        board_squares = player.get_board_squares()
+        kicked_tokens = []
+        for token_name in action:
+            if token_name == 'p':
+                token_steps = player.get_token_p_step_count()
+            else:
+                token_steps = player.get_token_q_step_count()
+            # leave Home on a 6
+            if token_steps == -1:
+                self.move_token(player, token_name, 1)
+                continue
+            # opponents on the square the token lands on, once for stacked tokens landing together
+            if 0 < token_steps + steps <= 56:
+                for token in self._occupancy.get_opponent_tokens(board_squares[token_steps + steps + 1],
+                                                                 player.get_position()):
+                    if token not in kicked_tokens:
+                        kicked_tokens.append(token)
+            self.move_token(player, token_name, steps)
+
+        for position, token_name in kicked_tokens:
+            if token_name == 'p':
+                self._player_list[position].kick_home_p()
+            else:
+                self._player_list[position].kick_home_q()
+        return len(kicked_tokens)
 
     def move_token(self, player, token_name, steps):
         """
         Move token p or q depending on the priority method which runs the priority rule.
         """
+        self._packed_state = None
         # If token name is p:
         if token_name == 'p':
             # variable to store current index of token p on the map, for example space 1 of player A has an index of 2
-            player_p_token_index = player.get_map().index(player.get_space_p())
+            player_p_token_index = player.get_token_p_step_count() + 1
             # if index + steps > 57, which means token will bounce back from E (index of A6, for example, is 57)
             if player_p_token_index + steps > 57:
-                # variable for the distance between current space and 'E'
-                dist_to_end = player.get_map().index('E') - player.get_map().index(player.get_space_p())
+                # variable for the distance between current space and 'E' (index of 'E' is 58)
+                dist_to_end = 58 - player_p_token_index
                 # bounce back token
                 player.move_token_p(2 * dist_to_end - steps)
             else:
@@ -180,11 +813,11 @@ class LudoGame:
         # If token name is q:
         if token_name == 'q':
             # variable to store current index of token q on the map, for example space 1 of player A has an index of 2
-            player_q_token_index = player.get_map().index(player.get_space_q())
+            player_q_token_index = player.get_token_q_step_count() + 1
             # if index + steps > 57, which means token will bounce back from E (index of A6, for example, is 57)
             if player_q_token_index + steps > 57:
-                # variable for the distance between current space and 'E'
-                dist_to_end = player.get_map().index('E') - player.get_map().index(player.get_space_q())
+                # variable for the distance between current space and 'E' (index of 'E' is 58)
+                dist_to_end = 58 - player_q_token_index
                 # bounce back token
                 player.move_token_q(2 * dist_to_end - steps)
             else:
@@ -195,100 +828,158 @@ class LudoGame:
         """
         Set priority rule to decide which token to move based on player's dice rolls.
         Parameters are player objects and number of steps based on roll.
+        Return the name of the rule that decided the turn: 'complete' (the player has finished and is skipped),
+        'no_move' (both tokens are Home and the roll is not a 6), 'leave_home', 'exact_finish', 'kick',
+        'only_token' (one token is Home so the other moves), 'lower_count' (the token with the lower step count
+        moves), or for stacked tokens 'stacked_finish', 'stacked_kick' and 'stacked_move'.
         """
+        self._packed_state = None
         # if player has finished game, pass
         if player.get_completed() is True:
-            pass
+            return 'complete'
         # Else, if player is still playing
         else:
+            # step counts of both tokens, -1 means the token is in Home ('H') and 0 means it is Ready to go ('R')
+            steps_p = player.get_token_p_step_count()
+            steps_q = player.get_token_q_step_count()
             # if two tokens are stacked:
-            if player.get_space_p() != 'H' and player.get_space_p() == player.get_space_q() and \
-                    player.get_space_p() != 'R':
+            if steps_p != -1 and steps_p == steps_q and steps_p != 0:
                 # situation of rolling 6 is not needed because since tokens are stacked, they must not be home
 
                 # if neither token is Home, get them to E space if it's an exact roll if possible
-                if player.get_token_p_step_count() + steps == 57:
+                if steps_p + steps == 57:
                     self.move_token(player, 'p', steps)
                     self.move_token(player, 'q', steps)
+                    return 'stacked_finish'
                 # attempt to kick other tokens if possible
                 elif self.check_to_kick(player, steps) is True:
                     self.kick(player, steps)
+                    return 'stacked_kick'
                 # else, move tokens
                 else:
                     self.move_token(player, 'p', steps)  # move player token p by steps
                     self.move_token(player, 'q', steps)  # move player token q by steps
+                    return 'stacked_move'
 
             # else if tokens are not stacked
             else:
                 # if steps = 6:
                 if steps == 6:
                     # 1st rule, get any remaining token out of Home
-                    if player.get_space_p() == 'H':
+                    if steps_p == -1:
                         self.move_token(player, 'p', 1)
-                    elif player.get_space_q() == 'H':
+                        return 'leave_home'
+                    elif steps_q == -1:
                         self.move_token(player, 'q', 1)
+                        return 'leave_home'
                     # 2nd rule, if neither token is Home, get them to E space if it's an exact roll
-                    elif player.get_token_p_step_count() == 51:
+                    elif steps_p == 51:
                         self.move_token(player, 'p', 6)
-                    elif player.get_token_q_step_count() == 51:
+                        return 'exact_finish'
+                    elif steps_q == 51:
                         self.move_token(player, 'q', 6)
+                        return 'exact_finish'
                     # 3rd rule, kick an opponent if possible
                     elif self.check_to_kick(player, 6) is True:
                         self.kick(player, 6)
+                        return 'kick'
                     # 4th rule, move the token with the lower step count
                     else:
-                        if player.get_token_p_step_count() < player.get_token_q_step_count():
+                        if steps_p < steps_q:
                             self.move_token(player,'p', steps)
                         else:
                             self.move_token(player,'q', steps)
+                        return 'lower_count'
                 # if roll is not 6:
                 elif steps != 6:
                     # if both tokens are home, pass since player can't move
-                    if player.get_space_p() == 'H':
-                        if player.get_space_q() == 'H':
-                            pass
+                    if steps_p == -1:
+                        if steps_q == -1:
+                            return 'no_move'
                         # if p is home but q is not:
-                        elif player.get_space_q() != 'H':
+                        elif steps_q != -1:
                             # move p to 'E' if possible
-                            if player.get_token_q_step_count() + steps == 57:
+                            if steps_q + steps == 57:
                                 self.move_token(player,'q', steps)
+                                return 'exact_finish'
                             # else, kick opponent's token
                             elif self.check_to_kick(player, steps) is True:
                                 # if there is no exact move to E, kick an opponent if possible
                                 self.kick(player, steps)
+                                return 'kick'
                             # else, move q
                             else:
                                 self.move_token(player,'q', steps)
+                                return 'only_token'
                     # if p is not home:
-                    elif player.get_space_p() != 'H':
+                    elif steps_p != -1:
                         # and if q is home:
-                        if player.get_space_q() == 'H':
+                        if steps_q == -1:
                             # move p to 'E' on exact roll if possible
-                            if player.get_token_p_step_count() + steps == 57:
+                            if steps_p + steps == 57:
                                 self.move_token(player,'p', steps)
+                                return 'exact_finish'
                             # else, kick opponent's token if possible
                             elif self.check_to_kick(player, steps) is True:
                                 # if there is no exact move to E, kick an opponent if possible
                                 self.kick(player, steps)
+                                return 'kick'
                             # else, move p
                             else:
                                 self.move_token(player,'p', steps)
+                                return 'only_token'
                         # if q is not home (both tokens are active)
-                        elif player.get_space_q() != 'H':
+                        elif steps_q != -1:
                             # move token p or q to 'E' on exact roll
-                            if player.get_token_p_step_count() + steps == 57:
+                            if steps_p + steps == 57:
                                 self.move_token(player,'p', steps)
-                            elif player.get_token_q_step_count() + steps == 57:
+                                return 'exact_finish'
+                            elif steps_q + steps == 57:
                                 self.move_token(player, 'q', steps)
+                                return 'exact_finish'
                             # else, kick opponent's token if possible
                             elif self.check_to_kick(player, steps) is True:
                                 # if there is no exact move to E, kick an opponent if possible
                                 self.kick(player, steps)
+                                return 'kick'
                             # else, move token with lower step count
-                            elif player.get_token_p_step_count() <= player.get_token_q_step_count():
+                            elif steps_p <= steps_q:
                                 self.move_token(player,'p', steps)
+                                return 'lower_count'
                             else:
                                 self.move_token(player,'q', steps)
+                                return 'lower_count'
+
+    def table_priority(self, player, steps):
+        """
+        Play one roll of player like priority and return the same rule name, through the precomputed decision
+        table: the move is one lookup by the step counts of the tokens and the roll, and the opponents are only
+        looked at (by check_to_kick) when the table marks the entry as kick-sensitive.
+        """
+        self._packed_state = None
+        steps_p = player.get_token_p_step_count()
+        steps_q = player.get_token_q_step_count()
+        # the table only covers rolls of 1 to 6 and tokens from 'H' to 'E', anything else goes through priority
+        if not (1 <= steps <= 6 and -1 <= steps_p <= 57 and -1 <= steps_q <= 57):
+            return self.priority(player, steps)
+        decision = _DECISIONS[((steps_p + 1) * 59 + steps_q + 1) * 7 + steps]
+        # a kick goes before the move of the entry if an opponent is on a square a token lands on
+        kick_rule = decision >> 16 & 15
+        if kick_rule:
+            board_squares = player.get_board_squares()
+            position = player.get_position()
+            if decision >> 20 & 1 and self._occupancy.has_opponent(board_squares[steps_p + steps + 1], position) or \
+                    decision >> 21 and self._occupancy.has_opponent(board_squares[steps_q + steps + 1], position):
+                self.kick(player, steps)
+                return _RULE_NAMES[kick_rule]
+        # move the tokens to their new step counts, a move of the difference lands exactly there
+        new_p = (decision & 63) - 1
+        new_q = (decision >> 6 & 63) - 1
+        if new_p != steps_p:
+            player.move_token_p(new_p - steps_p)
+        if new_q != steps_q:
+            player.move_token_q(new_q - steps_q)
+        return _RULE_NAMES[decision >> 12 & 15]
 
     def get_player_by_position(self, player_pos):
         """Return player object based on position."""
@@ -301,134 +992,156 @@ class LudoGame:
 class Player:
     """
     Represent the player class. This class contains key information that define a player: chosen position (‘A’, ‘B’),
-     start and end space (i.e. 1 and 50 for player at position A), current position of token p and q (‘HOME’ or
-     ‘READY’), player map showing which space on the board the player can step into, which is different for each player,
-      and dictionary to match a player to the corresponding map.
+     start and end space (i.e. 1 and 50 for player at position A), and the total steps of token p and q. The player
+     map showing which space on the board the player can step into, which is different for each player, is shared
+     by all players at the same position. Players use __slots__, so a player is only its position and two integers.
       """
-    def __init__(self, chosen_pos, start_space, end_space, curr_pos_p, curr_pos_q, curr_state):
+    __slots__ = ('_chosen_pos', '_start_space', '_end_space', '_steps_p', '_steps_q', '_spaces', '_board_squares',
+                 '_occupancy', '_journal')
+
+    def __init__(self, chosen_pos, start_space, end_space, curr_pos_p='HOME', curr_pos_q='HOME',
+                 curr_state='IS_PLAYING'):
+        """
+        Initialize a player at chosen_pos with both tokens in Home. curr_pos_p, curr_pos_q and curr_state are
+        only accepted for compatibility, the position and state of the tokens follow from their total steps.
+        """
         self._chosen_pos = chosen_pos       # like 'A', 'B'....
         self._start_space = start_space     # 1 for player A, 15 for player B...
         self._end_space = end_space         # 50 for player A, 8 for player B
-        self._curr_pos_p = curr_pos_p       # 'HOME'
-        self._curr_pos_q = curr_pos_q       # 'HOME'
-        self._curr_space_p = 'H'
-        self._curr_space_q = 'H'
-        self._curr_state = curr_state       # 'IS_PLAYING'
-        self._a_map = ['H', 'R', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12', '13', '14', '15', '16', '17',
-                       '18', '19', '20', '21', '22', '23', '24', '25', '26', '27', '28', '29', '30', '31', '32', '33',
-                       '34', '35', '36', '37', '38', '39', '40', '41', '42', '43', '44', '45', '46', '47', '48', '49',
-                       '50', 'A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'E', '*', '*', '*', '*', '*', '*']
-        self._b_map = ['H', 'R', '15', '16', '17', '18', '19', '20', '21', '22', '23', '24', '25', '26', '27', '28', '29', '30',
-                       '31', '32', '33', '34', '35', '36', '37', '38', '39', '40', '41', '42', '43', '44', '45', '46',
-                       '47', '48', '49', '50', '51', '52', '53', '54', '55', '56', '1', '2', '3', '4', '5', '6', '7',
-                       '8', 'B1', 'B2', 'B3', 'B4', 'B5', 'B6', 'E', '*', '*', '*', '*', '*', '*']
-        self._c_map = ['H', 'R', '29', '30', '31', '32', '33', '34', '35', '36', '37', '38', '39', '40', '41', '42', '43', '44',
-                       '45', '46', '47', '48', '49', '50', '51', '52', '53', '54', '55', '56', '1', '2', '3', '4', '5',
-                       '6', '7', '8', '9', '10', '11', '12', '13', '14', '15', '16', '17', '18', '19', '20', '21',
-                       '22', 'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'E', '*', '*', '*', '*', '*', '*']
-        self._d_map = ['H', 'R', '43', '44', '45', '46', '47', '48', '49', '50', '51', '52', '53', '54', '55', '56', '1', '2',
-                       '3', '4', '5', '6', '7', '8', '9', '10', '11', '12', '13', '14', '15', '16', '17', '18', '19',
-                       '20', '21', '22', '23', '24', '25', '26', '27', '28', '29', '30', '31', '32', '33', '34',
-                       '35', '36', 'D1', 'D2', 'D3', 'D4', 'D5', 'D6', 'E', '*', '*', '*', '*', '*', '*']
-
-        self._map_match = {'A': self._a_map, 'B': self._b_map, 'C': self._c_map, 'D': self._d_map}
+        self._steps_p = -1                  # total steps of token p, -1 for 'H' and 0 for 'R'
+        self._steps_q = -1                  # total steps of token q
+        self._spaces = _STEP_TO_SPACE[chosen_pos]                   # shared space names, indexed by total steps + 1
+        self._board_squares = _STEP_TO_BOARD_SQUARE[chosen_pos]     # shared board square ids, None off the board
+        self._occupancy = None                                      # board occupancy of the game, see set_occupancy
+        self._journal = None                                        # journal recording token moves, see set_journal
 
     def get_map(self):
         """Return the map corresponding to the player with player object as the parameter."""
-        return self._map_match[self._chosen_pos]
+        return self._spaces
+
+    def get_position(self):
+        """Return the chosen position of the player, like 'A'."""
+        return self._chosen_pos
+
+    def get_board_squares(self):
+        """Return the board square ids of the player's map, indexed by total steps + 1 and None off the board."""
+        return self._board_squares
+
+    def set_occupancy(self, occupancy):
+        """Add the player's tokens to the BoardOccupancy of a game, which is then updated as they move."""
+        self._occupancy = occupancy
+        occupancy.add_token(self._board_squares[self._steps_p + 1], self._chosen_pos, 'p')
+        occupancy.add_token(self._board_squares[self._steps_q + 1], self._chosen_pos, 'q')
+
+    def set_journal(self, journal):
+        """
+        Record every change of the player's tokens in journal (None to stop), by calling its
+        record(position, token name, old steps, new steps) method.
+        """
+        self._journal = journal
+
+    def set_token_step_counts(self, steps_p, steps_q):
+        """Put tokens p and q at the given total steps, like when restoring a saved game."""
+        if self._journal is not None:
+            if steps_p != self._steps_p:
+                self._journal.record(self._chosen_pos, 'p', self._steps_p, steps_p)
+            if steps_q != self._steps_q:
+                self._journal.record(self._chosen_pos, 'q', self._steps_q, steps_q)
+        if self._occupancy is not None:
+            self._occupancy.move_token(self._board_squares[self._steps_p + 1], self._board_squares[steps_p + 1],
+                                       self._chosen_pos, 'p')
+            self._occupancy.move_token(self._board_squares[self._steps_q + 1], self._board_squares[steps_q + 1],
+                                       self._chosen_pos, 'q')
+        self._steps_p = steps_p
+        self._steps_q = steps_q
 
     def get_space_p(self):
         """Return current space of token p on board."""
-        return self._curr_space_p
+        return self._spaces[self._steps_p + 1]
 
     def get_space_q(self):
         """Return current space of token q on board."""
-        return self._curr_space_q
+        return self._spaces[self._steps_q + 1]
 
     def kick_home_p(self):
         """Reset space of token p to 'H' if it was kicked off the board."""
-        self._curr_space_p = 'H'        # reset space to 'H'
-        self._curr_pos_p = 'HOME'       # reset position to 'HOME'
+        if self._occupancy is not None:
+            self._occupancy.remove_token(self._board_squares[self._steps_p + 1], self._chosen_pos, 'p')
+        if self._journal is not None:
+            self._journal.record(self._chosen_pos, 'p', self._steps_p, -1)
+        self._steps_p = -1              # reset steps to -1, which is space 'H'
 
     def kick_home_q(self):
         """Reset space of token q to 'H' if it was kicked off the board."""
-        self._curr_space_q = 'H'        # reset space to 'H'
-        self._curr_pos_q = 'HOME'       # reset position to 'HOME'
+        if self._occupancy is not None:
+            self._occupancy.remove_token(self._board_squares[self._steps_q + 1], self._chosen_pos, 'q')
+        if self._journal is not None:
+            self._journal.record(self._chosen_pos, 'q', self._steps_q, -1)
+        self._steps_q = -1              # reset steps to -1, which is space 'H'
 
     def get_completed(self):
         """Return True if the player has finishes the game, False if not"""
-        if self._curr_space_p == 'E' and self._curr_space_q == 'E':
-            self._curr_state = 'FINISHED'
+        # 57 steps is space 'E'
+        if self._steps_p == 57 and self._steps_q == 57:
             return True
         else:
             return False
 
+    def get_packed_steps(self):
+        """Return the bits of the player's position and tokens in a game packed by pack_steps."""
+        shift = _PACK_SHIFT[self._chosen_pos]
+        return _PACK_BIT[self._chosen_pos] | (self._steps_p + 1) << shift | (self._steps_q + 1) << (shift + 6)
+
     def get_token_p_step_count(self):
         """Get the steps taken by token p."""
-        if self._curr_space_p == "H":     # if current space is Home, step count = -1
-            return -1
-        if self._curr_space_p == "R":     # if current space is Ready to go, step count = 0
-            return 0
-        # else, steps taken equal to index of current space minus index of 'R' on the map corresponding to the player
-        else:
-            return self._map_match[self._chosen_pos].index(self._curr_space_p) \
-                   - self._map_match[self._chosen_pos].index('R')
+        # -1 for Home, 0 for Ready to go, else the distance from space 'R'
+        return self._steps_p
 
     def get_token_q_step_count(self):
         """Get the steps taken by token q."""
-        if self._curr_space_q == "H":     # if current space is Home, step count = -1
-            return -1
-        if self._curr_space_q == "R":     # if current space is Ready to go, step count = 0
-            return 0
-        # else, steps taken equal to index of current space minus index of 'R' on the map corresponding to the player
-        else:
-            return self._map_match[self._chosen_pos].index(self._curr_space_q) \
-                   - self._map_match[self._chosen_pos].index('R')
+        # -1 for Home, 0 for Ready to go, else the distance from space 'R'
+        return self._steps_q
 
     def move_token_p(self, steps):
         """Move token p by steps."""
-        # increment current space of token p to the value in corresponding player map by steps
-        self._curr_space_p = self._map_match[self._chosen_pos][
-            self._map_match[self._chosen_pos].index(self._curr_space_p) + int(steps)]
-        # update current position of token to home, ready, on board or end based on position on the player map
-        if self._map_match[self._chosen_pos].index(self._curr_space_p) == 0:
-            self._curr_pos_p = 'HOME'
-        elif self._map_match[self._chosen_pos].index(self._curr_space_p) == 1:
-            self._curr_pos_p = 'READY'
-        elif self._map_match[self._chosen_pos].index(self._curr_space_p) <= 57:
-            self._curr_pos_p = 'ON_BOARD'
-        else:
-            self._curr_pos_p = 'END'
+        # increment the map index of token p by steps and look up the total steps of the space it lands on
+        old_steps = self._steps_p
+        self._steps_p = _LANDING_STEP[self._steps_p + 1 + int(steps)]
+        # update the board occupancy of the game
+        if self._occupancy is not None:
+            self._occupancy.move_token(self._board_squares[old_steps + 1], self._board_squares[self._steps_p + 1],
+                                       self._chosen_pos, 'p')
+        if self._journal is not None:
+            self._journal.record(self._chosen_pos, 'p', old_steps, self._steps_p)
 
     def move_token_q(self, steps):
         """Move token q by steps."""
-        # increment current space of token q to the value in corresponding player map by steps
-        self._curr_space_q = self._map_match[self._chosen_pos][
-            self._map_match[self._chosen_pos].index(self._curr_space_q) + steps]
-        # update current position of token to home, ready, on board or end based on position on the player map
-        if self._map_match[self._chosen_pos].index(self._curr_space_q) == 0:
-            self._curr_pos_q = 'HOME'
-        elif self._map_match[self._chosen_pos].index(self._curr_space_q) == 1:
-            self._curr_pos_q = 'READY'
-        elif self._map_match[self._chosen_pos].index(self._curr_space_q) <= 57:
-            self._curr_pos_q = 'ON_BOARD'
-        else:
-            self._curr_pos_q = 'END'
+        # increment the map index of token q by steps and look up the total steps of the space it lands on
+        old_steps = self._steps_q
+        self._steps_q = _LANDING_STEP[self._steps_q + 1 + steps]
+        # update the board occupancy of the game
+        if self._occupancy is not None:
+            self._occupancy.move_token(self._board_squares[old_steps + 1], self._board_squares[self._steps_q + 1],
+                                       self._chosen_pos, 'q')
+        if self._journal is not None:
+            self._journal.record(self._chosen_pos, 'q', old_steps, self._steps_q)
 
     def get_space_name(self, total_steps):
         """Return token's space name based on steps taken."""
         # Return the item at index + 1 position on the player map, as the first two positions are 'H' & 'R'
         # For example, at total steps = 3, the function will return the space at index 4, which is space '3'
-        return self._map_match[self._chosen_pos][total_steps + 1]
-
-# try calling these steps
-players = ['A', 'B']
-turns = [('A', 6), ('A', 4), ('A', 5), ('A', 4), ('B', 6), ('B', 4), ('B', 1), ('B', 2), ('A', 6), ('A', 4), ('A', 6), ('A', 3), ('A', 5), ('A', 1), ('A', 5), ('A', 4)]
-game = LudoGame()
-current_tokens_space = game.play_game(players, turns)
-player_A = game.get_player_by_position('A')
-print(player_A.get_completed())
-print(player_A.get_token_p_step_count())
-print(current_tokens_space)
-player_B = game.get_player_by_position('B')
-print(player_B.get_space_name(55))
+        return self._spaces[total_steps + 1]
+
+
+if __name__ == '__main__':
+    # try calling these steps
+    players = ['A', 'B']
+    turns = [('A', 6), ('A', 4), ('A', 5), ('A', 4), ('B', 6), ('B', 4), ('B', 1), ('B', 2), ('A', 6), ('A', 4), ('A', 6), ('A', 3), ('A', 5), ('A', 1), ('A', 5), ('A', 4)]
+    game = LudoGame()
+    current_tokens_space = game.play_game(players, turns)
+    player_A = game.get_player_by_position('A')
+    print(player_A.get_completed())
+    print(player_A.get_token_p_step_count())
+    print(current_tokens_space)
+    player_B = game.get_player_by_position('B')
+    print(player_B.get_space_name(55))
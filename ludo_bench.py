@@ -0,0 +1,359 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Benchmark LudoGame on fixed-seed workloads and compare the results against a stored baseline
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from LudoGame import LudoGame, Player
+from ludo_turns import make_biased_turns, bounced, kicked, stacked
+
+# results of a run on the reference machine, compared against by default
+_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# turns measured one at a time under tracemalloc for the allocations of each workload
+_ALLOCATION_TURNS = 2000
+
+# iterations of the calibration loop timed with each workload
+_CALIBRATION_OPS = 500000
+
+
+class Workload:
+    """
+    Represents one benchmark: a list of games (players list, turns list) made from a fixed seed, played rounds
+    times on a new LudoGame each. Games are played with play_game, whose turns are lookups in the decision table
+    of table_priority (with kick for the turns that kick), or with ladder True turn by turn with priority, the rule
+    ladder that calls check_to_kick, kick and move_token. Subclasses change how the games are made or what is run.
+    """
+
+    def __init__(self, name, players, games, turns_per_game, rounds=1, ladder=False):
+        """Initialize a workload of games random games of turns_per_game turns between the players list."""
+        self._name = name
+        self._players = players
+        self._game_count = games
+        self._turns_per_game = turns_per_game
+        self._rounds = rounds
+        self._ladder = ladder
+        self._games = []
+
+    def get_name(self):
+        """Return the name of the workload."""
+        return self._name
+
+    def prepare(self, seed):
+        """Make the games of the workload from seed, the same games for the same seed."""
+        rng = random.Random('%s-%s' % (seed, self._name))
+        self._games = [(self._players, self._make_turns(rng)) for _ in range(self._game_count)]
+
+    def _make_turns(self, rng):
+        """Return the turns of one game, random rolls of random players."""
+        return [(rng.choice(self._players), rng.randint(1, 6)) for _ in range(self._turns_per_game)]
+
+    def get_ops(self):
+        """Return the number of operations (turns) one run does."""
+        return self._rounds * sum(len(turns) for _, turns in self._games)
+
+    def run(self):
+        """Play every game of the workload rounds times."""
+        for _ in range(self._rounds):
+            for players, turns in self._games:
+                if not self._ladder:
+                    LudoGame().play_game(players, turns)
+                    continue
+                game = LudoGame()
+                game.start_game(players)
+                player_list = {pos: game.get_player_by_position(pos) for pos in players}
+                for pos, roll in turns:
+                    game.priority(player_list[pos], roll)
+
+    def time_run(self):
+        """Return the process time of one run, without the garbage collector like timeit."""
+        gc.disable()
+        try:
+            started = time.process_time()
+            self.run()
+            return time.process_time() - started
+        finally:
+            gc.enable()
+
+    def iter_ops(self):
+        """
+        Yield the operations of a run one at a time as functions doing one turn, with the game set up to the state
+        before that turn, so their allocations can be measured one by one.
+        """
+        for players, turns in self._games:
+            game = LudoGame()
+            game.start_game(players)
+            for pos, roll in turns:
+                player = game.get_player_by_position(pos)
+                # the path run times
+                play = game.priority if self._ladder else game.table_priority
+                yield lambda: play(player, roll)
+
+
+class BiasedWorkload(Workload):
+    """
+    Represents games where each turn is, most of the time, picked among the turns that make a given situation
+    happen (a kick, stacked tokens, a bounce back from 'E'). With ladder True they stress that branch of the
+    priority rule (kick and check_to_kick, moving stacked tokens, the bounce back in move_token), else the same
+    situations through the decision table of play_game.
+    """
+
+    def __init__(self, name, players, games, turns_per_game, rounds, situation, bias=0.8, ladder=False):
+        """Initialize like Workload, situation(pos, roll, steps before, steps after) tells if a turn is wanted."""
+        super().__init__(name, players, games, turns_per_game, rounds, ladder)
+        self._situation = situation
+        self._bias = bias
+
+    def _make_turns(self, rng):
+        """Return the turns of one game, see make_biased_turns."""
+        return make_biased_turns(self._players, self._turns_per_game, rng, self._situation, self._bias)
+
+
+class PlayerWorkload(Workload):
+    """Represents building Player objects in a warm process, where the position tables are already made."""
+
+    def __init__(self, name, players):
+        """Initialize a workload building players Player objects."""
+        super().__init__(name, ['A'], players, 0)
+
+    def prepare(self, seed):
+        """Nothing to make, the same players are built for any seed."""
+
+    def get_ops(self):
+        """Return the number of players built."""
+        return self._game_count
+
+    def run(self):
+        """Build the players."""
+        for _ in range(self._game_count):
+            Player('A', 1, 50)
+
+    def iter_ops(self):
+        """Yield a function building one player per operation."""
+        for _ in range(self._game_count):
+            yield lambda: Player('A', 1, 50)
+
+
+class ColdPlayerWorkload(PlayerWorkload):
+    """
+    Represents building the first Player in a new interpreter, including importing LudoGame and making its tables.
+    Each run starts a process, so its time also covers starting Python, and no allocations are measured.
+    """
+
+    def __init__(self, name):
+        """Initialize the workload, one operation per run."""
+        super().__init__(name, 1)
+        self._seconds = None
+
+    def run(self):
+        """Time importing LudoGame and building a Player in a new process."""
+        code = ('import time; started = time.perf_counter(); from LudoGame import Player; Player("A", 1, 50); '
+                'print(time.perf_counter() - started)')
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self._seconds = float(output)
+
+    def time_run(self):
+        """Return the import and construction time measured inside the process by one run."""
+        self.run()
+        return self._seconds
+
+    def iter_ops(self):
+        """No operations are measured in this process."""
+        return iter(())
+
+
+def get_workloads():
+    """Return the list of workloads of the suite."""
+    return [
+        Workload('games_2p_short', ['A', 'C'], 2000, 30),
+        Workload('games_3p_short', ['A', 'B', 'C'], 2000, 30),
+        Workload('games_4p_short', ['A', 'B', 'C', 'D'], 2000, 30),
+        Workload('games_2p_long', ['A', 'C'], 240, 250),
+        Workload('games_3p_long', ['A', 'B', 'C'], 240, 250),
+        Workload('games_4p_long', ['A', 'B', 'C', 'D'], 240, 250),
+        BiasedWorkload('kick_heavy', ['A', 'B', 'C', 'D'], 50, 300, 4, kicked),
+        BiasedWorkload('stacked', ['A', 'C'], 100, 300, 2, stacked),
+        BiasedWorkload('bounce_back', ['A', 'C'], 100, 300, 2, bounced),
+        Workload('ladder_4p_long', ['A', 'B', 'C', 'D'], 240, 250, ladder=True),
+        BiasedWorkload('ladder_kick_heavy', ['A', 'B', 'C', 'D'], 50, 300, 4, kicked, ladder=True),
+        BiasedWorkload('ladder_stacked', ['A', 'C'], 100, 300, 2, stacked, ladder=True),
+        BiasedWorkload('ladder_bounce_back', ['A', 'C'], 100, 300, 2, bounced, ladder=True),
+        PlayerWorkload('player_warm', 50000),
+        ColdPlayerWorkload('player_cold'),
+    ]
+
+
+def _measure_allocations(workload):
+    """
+    Return the average number of bytes allocated by one operation of the workload, measured with tracemalloc as
+    the peak memory traced during the operation above the memory traced before it, over the first operations.
+    """
+    total = 0
+    count = 0
+    tracemalloc.start()
+    try:
+        for op in workload.iter_ops():
+            if count == _ALLOCATION_TURNS:
+                break
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            op()
+            total += tracemalloc.get_traced_memory()[1] - current
+            count += 1
+    finally:
+        tracemalloc.stop()
+    return total / count if count else None
+
+
+class _Calibration(Workload):
+    """Represents the fixed work timed next to each workload: table lookups, attribute reads and method calls."""
+
+    def __init__(self):
+        """Initialize the tables of the loop."""
+        super().__init__('calibration', [], 0, 0)
+        self._table = tuple(range(64))
+        self._names = {str(index): index for index in range(64)}
+
+    def _step(self, value, roll):
+        """Return the next value of the loop."""
+        return self._table[(value + roll) & 63]
+
+    def run(self):
+        """Run _CALIBRATION_OPS iterations of the loop."""
+        value = 0
+        names = self._names
+        for index in range(_CALIBRATION_OPS):
+            value = self._step(value, index % 6 + 1)
+            if names['1'] == value:
+                value += 1
+        return value
+
+    def get_ops(self):
+        """Return the number of iterations of the loop."""
+        return _CALIBRATION_OPS
+
+
+def _time_workload(workload, calibration, repeat):
+    """
+    Time repeat runs of the workload after one to warm up, each right after a run of the calibration loop. Return
+    the best time of a run and the median of the workload's speed relative to the loop over the pairs of runs,
+    which a slower machine or a busier moment changes much less than the time.
+    """
+    workload.run()
+    calibration.run()
+    best = None
+    relative_speeds = []
+    for _ in range(repeat):
+        calibration_seconds = calibration.time_run()
+        seconds = workload.time_run()
+        best = seconds if best is None else min(best, seconds)
+        relative_speeds.append(workload.get_ops() * calibration_seconds / (seconds * calibration.get_ops()))
+    return best, statistics.median(relative_speeds)
+
+
+def run_benchmarks(seed=0, repeat=11, only=None):
+    """
+    Run the workloads whose name contains only (all if None) repeat times each and return the results as a dict:
+    the best time of a run, operations per second, and bytes allocated per operation of each workload, and its
+    speed relative to the calibration loop timed before each run (see _time_workload). The relative speed is what
+    compare checks, so a baseline from another machine or a busier moment still compares.
+    """
+    calibration = _Calibration()
+    results = {}
+    for workload in get_workloads():
+        if only is not None and only not in workload.get_name():
+            continue
+        workload.prepare(seed)
+        best, relative_speed = _time_workload(workload, calibration, repeat)
+        results[workload.get_name()] = {
+            'ops': workload.get_ops(),
+            'seconds': best,
+            'ops_per_sec': workload.get_ops() / best,
+            'relative_speed': relative_speed,
+            'alloc_bytes_per_op': _measure_allocations(workload),
+        }
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'benchmarks': results,
+    }
+
+
+def compare(results, baseline, threshold=0.25):
+    """
+    Compare results against baseline results and return a list of (name, speed change, allocation change,
+    regressed) tuples, a change being the ratio of the new value to the baseline one. The speed compared is the
+    speed relative to the calibration loop, or ops/sec for a baseline saved without it. A workload regressed if
+    it is more than threshold slower or allocates more than threshold more per operation.
+    """
+    comparison = []
+    for name, result in results['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        if base.get('relative_speed') and result.get('relative_speed'):
+            speed = result['relative_speed'] / base['relative_speed']
+        else:
+            speed = result['ops_per_sec'] / base['ops_per_sec']
+        allocations = None
+        if result['alloc_bytes_per_op'] is not None and base['alloc_bytes_per_op']:
+            allocations = result['alloc_bytes_per_op'] / base['alloc_bytes_per_op']
+        regressed = speed < 1 - threshold or (allocations is not None and allocations > 1 + threshold)
+        comparison.append((name, speed, allocations, regressed))
+    return comparison
+
+
+def main():
+    """Run the suite from the command line, print the results and exit with status 1 if any workload regressed."""
+    parser = argparse.ArgumentParser(description='Benchmark LudoGame on fixed-seed workloads.')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the workloads')
+    parser.add_argument('--repeat', type=int, default=11,
+                        help='runs of each workload, paired with runs of the calibration loop')
+    parser.add_argument('--only', default=None, help='only run workloads whose name contains this')
+    parser.add_argument('--output', default=None, help='save the results as JSON to this file')
+    parser.add_argument('--baseline', default=_BASELINE_PATH, help='baseline results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='slowdown counted as a regression')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.seed, args.repeat, args.only)
+    if args.output is not None:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    changes = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            changes = {name: (speed, allocations, regressed) for name, speed, allocations, regressed
+                       in compare(results, json.load(baseline_file), args.threshold)}
+
+    print('%-20s %14s %14s %10s %10s' % ('workload', 'ops/sec', 'bytes/op', 'speed', 'bytes'))
+    for name, result in results['benchmarks'].items():
+        speed, allocations, regressed = changes.get(name, (None, None, False))
+        print('%-20s %14.0f %14s %10s %10s%s' % (
+            name, result['ops_per_sec'],
+            '-' if result['alloc_bytes_per_op'] is None else '%.1f' % result['alloc_bytes_per_op'],
+            '-' if speed is None else '%.2fx' % speed,
+            '-' if allocations is None else '%.2fx' % allocations,
+            '  REGRESSED' if regressed else ''))
+    if any(regressed for _, _, regressed in changes.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Differential fuzzer checking alternative Ludo engines against the priority rule of LudoGame
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from LudoGame import LudoGame, TransitionCache, _POSITIONS
+from ludo_rules import RulesEngine
+from ludo_turns import make_biased_turns, kicked, stacked
+
+try:
+    import ludo_batch
+except ImportError:
+    ludo_batch = None
+
+# kinds of cases the generators make
+KINDS = ('random', 'kick_heavy', 'stack_heavy', 'near_end')
+
+# failing cases kept (and shrunk) per engine in each shard
+_FAILURES_PER_SHARD = 3
+
+
+def play_reference(players, turns):
+    """
+    Return the list of token spaces after playing turns, the reference every engine is checked against: a new
+    LudoGame running its priority method turn by turn (the rule ladder itself, not the decision table).
+    """
+    game = LudoGame()
+    game.start_game(players)
+    for pos, roll in turns:
+        game.priority(game.get_player_by_position(pos), roll)
+    return game.get_spaces()
+
+
+def _play_each(play):
+    """Return a play_cases function for an engine playing one game with play(players, turns)."""
+    def play_cases(cases):
+        return [play(players, turns) for players, turns in cases]
+    return play_cases
+
+
+def _play_cached(cases):
+    """Play cases through LudoGame.play_turn with one TransitionCache shared by all of them."""
+    cache = TransitionCache(100000)
+    results = []
+    for players, turns in cases:
+        game = LudoGame(cache)
+        game.start_game(players)
+        for pos, roll in turns:
+            game.play_turn(game.get_player_by_position(pos), roll)
+        results.append(game.get_spaces())
+    return results
+
+
+def _play_batched(cases):
+    """Play cases with ludo_batch, one batch for the cases of each list of players."""
+    groups = {}
+    for index, (players, turns) in enumerate(cases):
+        groups.setdefault(tuple(players), []).append(index)
+    results = [None] * len(cases)
+    for players, indexes in groups.items():
+        for index, spaces in zip(indexes, ludo_batch.play_games(list(players), [cases[i][1] for i in indexes])):
+            results[index] = spaces
+    return results
+
+
+# engine name -> function taking a list of (players, turns) cases and returning the list of token spaces of each
+_ENGINES = {
+    'play_game': _play_each(lambda players, turns: LudoGame().play_game(players, turns)),
+    'transition_cache': _play_cached,
+    'rules_engine': _play_each(RulesEngine().play_game),
+}
+if ludo_batch is not None:
+    _ENGINES['batch'] = _play_batched
+
+
+def register_engine(name, play_cases):
+    """
+    Register an engine to check, play_cases taking a list of (players, turns) cases and returning the list of
+    token spaces of each, like LudoGame.play_game. Workers started by fork see the engines registered before
+    run_fuzz is called.
+    """
+    _ENGINES[name] = play_cases
+
+
+def get_engines():
+    """Return the list of names of the registered engines."""
+    return list(_ENGINES)
+
+
+def _play_with_errors(play_cases, cases):
+    """Return the results of play_cases, with every case playing one at a time if the cases fail together."""
+    try:
+        return play_cases(cases)
+    except Exception:
+        results = []
+        for case in cases:
+            try:
+                results.append(play_cases([case])[0])
+            except Exception as error:
+                # an engine raising is a divergence like any wrong result
+                results.append('%s: %s' % (type(error).__name__, error))
+        return results
+
+
+def _near_end(pos, roll, before, after):
+    """Return True if a token of the mover was or is on its home squares or 'E' around the turn."""
+    return max(before[pos]) > 50 or max(after[pos]) > 50
+
+
+def _progress(pos, roll, before, after):
+    """Return the steps the mover's tokens went forward in the turn."""
+    return sum(after[pos]) - sum(before[pos])
+
+
+def generate_case(rng, kind, max_turns=300):
+    """
+    Return a random case (players, turns) of kind: 'random' rolls of random players, or 'kick_heavy',
+    'stack_heavy' or 'near_end', where most turns are picked among the turns that kick, stack the mover's tokens,
+    or move around the home squares and 'E', with the biased turns of the benchmarks (see
+    ludo_turns.make_biased_turns). Until a near_end turn is possible, the turn that moves the tokens furthest is
+    picked, to get there. Cases have 2 to 4 players.
+    """
+    players = sorted(rng.sample(_POSITIONS, rng.randint(2, 4)))
+    length = rng.randint(1, max_turns)
+    if kind == 'random':
+        return players, [(rng.choice(players), rng.randint(1, 6)) for _ in range(length)]
+    if kind == 'near_end':
+        return players, make_biased_turns(players, length, rng, _near_end, score=_progress)
+    situation = {'kick_heavy': kicked, 'stack_heavy': stacked}[kind]
+    return players, make_biased_turns(players, length, rng, situation)
+
+
+def shrink_case(play_cases, players, turns):
+    """
+    Return a smaller case (players, turns) on which play_cases still differs from play_reference: the shortest
+    failing prefix of turns, then removing chunks of turns and whole players (with their turns) for as long as the
+    case still fails, with chunks halving down to single turns.
+    """
+    def fails(case_players, case_turns):
+        result = _play_with_errors(play_cases, [(case_players, case_turns)])[0]
+        return result != play_reference(case_players, case_turns)
+
+    for length in range(len(turns) + 1):
+        if fails(players, turns[:length]):
+            turns = turns[:length]
+            break
+
+    changed = True
+    while changed:
+        changed = False
+        for pos in list(players):
+            fewer_players = [other for other in players if other != pos]
+            fewer_turns = [turn for turn in turns if turn[0] != pos]
+            if fewer_players and fails(fewer_players, fewer_turns):
+                players, turns = fewer_players, fewer_turns
+                changed = True
+        chunk = max(1, len(turns) // 2)
+        while chunk:
+            start = 0
+            while start < len(turns):
+                fewer_turns = turns[:start] + turns[start + chunk:]
+                if fails(players, fewer_turns):
+                    turns = fewer_turns
+                    changed = True
+                else:
+                    start += chunk
+            chunk //= 2
+    return players, turns
+
+
+def _fuzz_shard(task):
+    """
+    Generate and check the cases of one shard in a worker process. Return the turns played, the seconds each
+    engine (and the reference) took, and the shrunk failing cases as (engine, players, turns, expected, result).
+    """
+    seed, first, count, kinds, engines, max_turns = task
+    # every case has its own random generator, so cases do not depend on how they are split into shards
+    cases = []
+    for index in range(first, first + count):
+        rng = random.Random('%s-%d' % (seed, index))
+        cases.append(generate_case(rng, kinds[index % len(kinds)], max_turns))
+
+    seconds = {}
+    started = time.process_time()
+    expected = [play_reference(players, turns) for players, turns in cases]
+    seconds['reference'] = time.process_time() - started
+
+    failures = []
+    for name in engines:
+        started = time.process_time()
+        results = _play_with_errors(_ENGINES[name], cases)
+        seconds[name] = time.process_time() - started
+        failing = [index for index, result in enumerate(results) if result != expected[index]]
+        for index in failing[:_FAILURES_PER_SHARD]:
+            players, turns = shrink_case(_ENGINES[name], *cases[index])
+            failures.append((name, players, turns, play_reference(players, turns),
+                             _play_with_errors(_ENGINES[name], [(players, turns)])[0]))
+        # count every failing case, the ones not shrunk as None
+        failures.extend((name, None, None, None, None) for _ in failing[_FAILURES_PER_SHARD:])
+    return sum(len(turns) for _, turns in cases), seconds, failures
+
+
+def run_fuzz(cases, seed=0, kinds=KINDS, engines=None, workers=None, shard_size=200, max_turns=300):
+    """
+    Check the registered engines (or the list of names engines) on cases cases, kinds taking turns, on a pool of
+    workers processes (one per CPU by default). Return a dict of the turns checked, and for each engine its
+    failing cases, the number of failures, its seconds and turns per second, and its speed relative to the
+    reference. The same seed gives the same cases whatever the number of workers.
+    """
+    engines = list(engines) if engines is not None else get_engines()
+    tasks = [(seed, first, min(shard_size, cases - first), list(kinds), engines, max_turns)
+             for first in range(0, cases, shard_size)]
+    if workers == 1:
+        shards = map(_fuzz_shard, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        shards = pool.imap(_fuzz_shard, tasks)
+
+    turns = 0
+    seconds = dict.fromkeys(['reference'] + engines, 0.0)
+    failures = {name: [] for name in engines}
+    failure_counts = dict.fromkeys(engines, 0)
+    try:
+        for shard_turns, shard_seconds, shard_failures in shards:
+            turns += shard_turns
+            for name, shard_time in shard_seconds.items():
+                seconds[name] += shard_time
+            for name, players, case_turns, expected, result in shard_failures:
+                failure_counts[name] += 1
+                if players is not None:
+                    failures[name].append({'players': players, 'turns': case_turns, 'expected': expected,
+                                           'result': result})
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    report = {'cases': cases, 'turns': turns, 'reference': {'seconds': seconds['reference'],
+              'turns_per_second': turns / seconds['reference'] if seconds['reference'] else None}, 'engines': {}}
+    for name in engines:
+        report['engines'][name] = {
+            'failures': failure_counts[name],
+            'seconds': seconds[name],
+            'turns_per_second': turns / seconds[name] if seconds[name] else None,
+            'speed': seconds['reference'] / seconds[name] if seconds[name] else None,
+            # the shortest shrunk cases first
+            'failing_cases': sorted(failures[name], key=lambda case: len(case['turns']))[:10],
+        }
+    return report
+
+
+def main():
+    """Fuzz the engines from the command line, print the report and exit with status 1 if any check failed."""
+    parser = argparse.ArgumentParser(description='Check Ludo engines against the priority rule of LudoGame.')
+    parser.add_argument('--cases', type=int, default=10000, help='random cases to check')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the cases')
+    parser.add_argument('--kinds', default=','.join(KINDS), help='comma-separated kinds of cases')
+    parser.add_argument('--engines', default=None, help='comma-separated engines to check (default: all)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--max-turns', type=int, default=300, help='most turns in a case')
+    parser.add_argument('--min-speed', type=float, default=None,
+                        help='fail an engine slower than this many times the reference')
+    parser.add_argument('--output', default=None, help='save the report as JSON to this file')
+    args = parser.parse_args()
+
+    kinds = args.kinds.split(',')
+    if any(kind not in KINDS for kind in kinds):
+        parser.error('kinds are %s' % ', '.join(KINDS))
+    engines = args.engines.split(',') if args.engines is not None else None
+    if engines is not None and any(name not in _ENGINES for name in engines):
+        parser.error('engines are %s' % ', '.join(get_engines()))
+    report = run_fuzz(args.cases, args.seed, kinds, engines, args.workers, max_turns=args.max_turns)
+    if args.output is not None:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    print('%d cases, %d turns, reference %.0f turns/sec'
+          % (report['cases'], report['turns'], report['reference']['turns_per_second'] or 0))
+    print('%-18s %10s %14s %8s' % ('engine', 'failures', 'turns/sec', 'speed'))
+    failed = False
+    for name, result in report['engines'].items():
+        slow = args.min_speed is not None and (result['speed'] or 0) < args.min_speed
+        failed = failed or result['failures'] > 0 or slow
+        print('%-18s %10d %14.0f %7.2fx%s' % (name, result['failures'], result['turns_per_second'] or 0,
+                                              result['speed'] or 0, '  TOO SLOW' if slow else ''))
+        for case in result['failing_cases'][:3]:
+            print('  %s' % json.dumps(case))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Journal the token moves of a Ludo game turn by turn, with undo, redo and checkpointed seeking
+
+import struct
+import sys
+from array import array
+
+from LudoGame import LudoGame, _POSITIONS, _PACK_SHIFT
+
+# a delta is one token changing steps, packed into 15 bits: position index (2 bits), token (1 bit, 1 for q), the
+# old steps + 1 and the new steps + 1 (6 bits each)
+_POSITION_INDEX = {pos: index for index, pos in enumerate(_POSITIONS)}
+
+# serialized journal: a header, the sizes of the arrays, then the arrays as little-endian numbers
+_JOURNAL_HEADER = b'LUDOJNL1'
+_JOURNAL_SIZES = struct.Struct('<IIIIII')
+
+
+def _little_endian(numbers):
+    """Return the bytes of an array as little-endian numbers."""
+    if sys.byteorder != 'little':
+        numbers = array(numbers.typecode, numbers)
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _from_little_endian(typecode, data):
+    """Return an array of typecode from bytes made by _little_endian."""
+    numbers = array(typecode)
+    numbers.frombytes(data)
+    if sys.byteorder != 'little':
+        numbers.byteswap()
+    return numbers
+
+
+class GameJournal:
+    """
+    Represents the history of a game as an append-only list of deltas, one for every change of a token made by
+    Player.move_token_p/q, kick_home_p/q or set_token_step_counts, grouped into turns. The journal is attached to
+    the players of a game, turns are played through play_turn, and the game can be moved back and forth between
+    turns: undo and redo apply the few deltas of one turn, and every checkpoint_interval turns the packed state of
+    the game is kept as a checkpoint, so seek to any turn restores at most one checkpoint and then applies the
+    deltas of fewer than checkpoint_interval turns. Playing a turn after undo drops the turns that were undone.
+    """
+
+    def __init__(self, game, checkpoint_interval=64):
+        """Initialize an empty journal for a started LudoGame, which starts at turn 0 in its current state."""
+        self._game = game
+        self._checkpoint_interval = checkpoint_interval
+        self._deltas = array('H')           # deltas of all turns, in the order they were made
+        self._offsets = array('I', [0])     # index in _deltas where each turn ends, the first turn starts at 0
+        self._turns = array('B')            # index of the position rolling * 8 + roll of each turn
+        self._checkpoints = array('Q', [game.get_packed_state()])   # packed state at every checkpoint_interval turns
+        self._turn = 0                      # turn the game is at, less than the turns journaled after undo
+        self._replaying = False             # True while the journal moves tokens itself, so they are not recorded
+        self.attach()
+
+    def attach(self):
+        """Record the changes of the tokens of the game's players, for example after restoring it."""
+        for pos in _POSITIONS:
+            player = self._game.get_player_by_position(pos)
+            if player != 'Player not found!':
+                player.set_journal(self)
+
+    def detach(self):
+        """Stop recording the changes of the game's players."""
+        for pos in _POSITIONS:
+            player = self._game.get_player_by_position(pos)
+            if player != 'Player not found!':
+                player.set_journal(None)
+
+    def get_game(self):
+        """Return the LudoGame of the journal."""
+        return self._game
+
+    def get_turn(self):
+        """Return the turn the game is at."""
+        return self._turn
+
+    def get_turn_count(self):
+        """Return the number of turns journaled, including the ones undone."""
+        return len(self._offsets) - 1
+
+    def get_turns(self):
+        """Return the list of (position, roll) tuples of the turns journaled."""
+        return [(_POSITIONS[code >> 3], code & 7) for code in self._turns]
+
+    def record(self, position, token_name, old_steps, new_steps):
+        """Add the change of one token to the turn being played, called by Player when it changes a token."""
+        if self._replaying:
+            return
+        if self._turn < self.get_turn_count():
+            self._truncate()
+        self._deltas.append(_POSITION_INDEX[position] << 13 | (token_name == 'q') << 12 | (old_steps + 1) << 6
+                            | (new_steps + 1))
+
+    def play_turn(self, player_pos, roll):
+        """
+        Play one roll of the player at player_pos by the priority rule (through LudoGame.play_turn, so with the
+        game's transition cache and instrumentation) and journal it as the next turn.
+        """
+        player = self._game.get_player_by_position(player_pos)
+        if player == 'Player not found!':
+            raise ValueError('Player not found!')
+        if self._turn < self.get_turn_count():
+            self._truncate()
+        self._game.play_turn(player, roll)
+        self._turns.append(_POSITION_INDEX[player_pos] << 3 | roll)
+        self._offsets.append(len(self._deltas))
+        self._turn += 1
+        if self._turn % self._checkpoint_interval == 0:
+            self._checkpoints.append(self._game.get_packed_state())
+
+    def undo(self):
+        """Move the game back one turn, return False if it is at turn 0."""
+        if self._turn == 0:
+            return False
+        self._move(self._game.get_packed_state(), self._turn, self._turn - 1)
+        return True
+
+    def redo(self):
+        """Move the game forward one undone turn, return False if there is none."""
+        if self._turn == self.get_turn_count():
+            return False
+        self._move(self._game.get_packed_state(), self._turn, self._turn + 1)
+        return True
+
+    def seek(self, turn):
+        """
+        Move the game to the state after turn turns, from the game's current turn if that is closer than the last
+        checkpoint at or before turn.
+        """
+        if not 0 <= turn <= self.get_turn_count():
+            raise ValueError('Turn not found!')
+        checkpoint = turn // self._checkpoint_interval
+        if abs(turn - self._turn) <= turn - checkpoint * self._checkpoint_interval:
+            self._move(self._game.get_packed_state(), self._turn, turn)
+        else:
+            self._move(self._checkpoints[checkpoint], checkpoint * self._checkpoint_interval, turn)
+
+    def _move(self, packed, from_turn, to_turn):
+        """Apply the deltas between two turns to packed, the game's state at from_turn, and restore the result."""
+        deltas = self._deltas
+        offsets = self._offsets
+        if to_turn >= from_turn:
+            for index in range(offsets[from_turn], offsets[to_turn]):
+                packed = self._apply(packed, deltas[index], deltas[index] & 63)
+        else:
+            for index in range(offsets[from_turn] - 1, offsets[to_turn] - 1, -1):
+                packed = self._apply(packed, deltas[index], deltas[index] >> 6 & 63)
+        self._replaying = True
+        try:
+            self._game.set_packed_state(packed)
+        finally:
+            self._replaying = False
+        self._turn = to_turn
+
+    @staticmethod
+    def _apply(packed, delta, steps_code):
+        """Return packed with the token of delta set to steps_code (steps + 1)."""
+        shift = _PACK_SHIFT[_POSITIONS[delta >> 13]] + 6 * (delta >> 12 & 1)
+        return packed & ~(63 << shift) | steps_code << shift
+
+    def _truncate(self):
+        """Drop the turns after the current turn, which were undone, before journaling a new one."""
+        end = self._offsets[self._turn]
+        pending = self._deltas[self._offsets[-1]:]
+        del self._deltas[end:]
+        self._deltas.extend(pending)
+        del self._offsets[self._turn + 1:]
+        del self._turns[self._turn:]
+        del self._checkpoints[self._turn // self._checkpoint_interval + 1:]
+
+    def to_bytes(self):
+        """Return the journal as bytes, to resume the game with from_bytes."""
+        return b''.join([
+            _JOURNAL_HEADER,
+            _JOURNAL_SIZES.pack(self._checkpoint_interval, self._turn, len(self._deltas), len(self._offsets),
+                                len(self._turns), len(self._checkpoints)),
+            _little_endian(self._deltas),
+            _little_endian(self._offsets),
+            _little_endian(self._turns),
+            _little_endian(self._checkpoints),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data, game=None):
+        """
+        Return the journal of bytes made by to_bytes, with its game (a new LudoGame if None) restored to the turn
+        it was at from the nearest checkpoint, without replaying the game from the start.
+        """
+        if data[:len(_JOURNAL_HEADER)] != _JOURNAL_HEADER:
+            raise ValueError('Not a game journal!')
+        interval, turn, deltas, offsets, turns, checkpoints = _JOURNAL_SIZES.unpack_from(data, len(_JOURNAL_HEADER))
+        offset = len(_JOURNAL_HEADER) + _JOURNAL_SIZES.size
+        arrays = []
+        for typecode, count in (('H', deltas), ('I', offsets), ('B', turns), ('Q', checkpoints)):
+            size = array(typecode).itemsize * count
+            arrays.append(_from_little_endian(typecode, data[offset:offset + size]))
+            offset += size
+
+        if game is None:
+            game = LudoGame()
+        game.set_packed_state(arrays[3][0])
+        journal = cls(game, interval)
+        journal._deltas, journal._offsets, journal._turns, journal._checkpoints = arrays
+        journal.seek(turn)
+        return journal
@@ -0,0 +1,333 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Replay many Ludo games from JSONL or binary turn-log files and write their final token spaces
+
+import time
+
+_STARTED = time.perf_counter()     # module load time, startup is measured from here
+
+import argparse
+import contextlib
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+
+from LudoGame import LudoGame, TransitionCache, _POSITIONS
+
+try:
+    import resource
+except ImportError:     # not available on Windows, peak memory is then not reported
+    resource = None
+
+# a binary turn log is a header and then one record per game: a byte of the positions playing (bit 0 for 'A' to
+# bit 3 for 'D', like pack_steps), the number of turns as 4 little-endian bytes, and one byte per turn holding the
+# index of the position rolling times 8 plus the roll
+_LOG_HEADER = b'LUDOLOG1'
+_GAME_HEADER = struct.Struct('<BI')
+
+# (position, roll) of each turn byte, None for the bytes of rolls 0 and 7 which are not rolls of a die
+_TURN_CODES = tuple((pos, roll) if 1 <= roll <= 6 else None for pos in _POSITIONS for roll in range(8))
+
+# bytes of input each task replays, so output is written in bulk and workers get a share of the file
+_CHUNK_SIZE = 1 << 22
+
+
+def _check_game(players, turns):
+    """Raise ValueError if a game has a position that is not 'A' to 'D', or a turn replay_game would refuse."""
+    if any(pos not in _POSITIONS for pos in players):
+        raise ValueError('Invalid players: %r' % (players,))
+    for pos, roll in turns:
+        if pos not in players:
+            raise ValueError('Player not found!')
+        if roll not in (1, 2, 3, 4, 5, 6):
+            raise ValueError('Invalid roll: %r' % (roll,))
+
+
+def write_binary_log(path, games):
+    """
+    Write games, an iterable of (players list, turns list) like the parameters of play_game, as a binary log.
+    Raise ValueError for a game replay_game would refuse. The log is written to a temporary file renamed to path
+    at the end, so a failed write leaves no partial log behind.
+    """
+    temporary_path = path + '.tmp'
+    try:
+        with open(temporary_path, 'wb') as log_file:
+            log_file.write(_LOG_HEADER)
+            for players, turns in games:
+                _check_game(players, turns)
+                mask = 0
+                for index, pos in enumerate(_POSITIONS):
+                    if pos in players:
+                        mask |= 1 << index
+                log_file.write(_GAME_HEADER.pack(mask, len(turns)))
+                log_file.write(bytes(_POSITIONS.index(pos) << 3 | roll for pos, roll in turns))
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def convert_log(path, binary_path):
+    """
+    Convert the JSONL or binary log at path to a binary log at binary_path. Invalid games are skipped, like
+    replay_log reports them as errors and goes on. Return a dict of the games written and skipped.
+    """
+    stats = {'games': 0, 'errors': 0}
+
+    def valid_games():
+        with _open_log(path) as log:
+            if log is None:
+                return
+            for players, turns in _iter_games(log, _log_format(log), 0, len(log)):
+                try:
+                    if players is None:
+                        raise ValueError(turns)
+                    _check_game(players, turns)
+                except (ValueError, TypeError):
+                    stats['errors'] += 1
+                    continue
+                stats['games'] += 1
+                yield players, turns
+
+    write_binary_log(binary_path, valid_games())
+    return stats
+
+
+def read_games(path):
+    """Yield the (players list, turns list) of every game of a JSONL or binary log, reading it memory-mapped."""
+    with _open_log(path) as log:
+        if log is None:
+            return
+        for players, turns in _iter_games(log, _log_format(log), 0, len(log)):
+            if players is None:
+                raise ValueError(turns)
+            yield players, turns
+
+
+def replay_game(players, turns, transition_cache=None):
+    """
+    Replay one game and return the list of token spaces play_game returns and the position that finished first
+    (None if nobody finished). Raise ValueError if a turn is for a position not in the game or its roll is not
+    1 to 6.
+    """
+    game = LudoGame(transition_cache)
+    game.start_game(players)
+    player_list = {pos: game.get_player_by_position(pos) for pos in _POSITIONS if pos in players}
+    winner = None
+    for pos, roll in turns:
+        player = player_list.get(pos)
+        if player is None:
+            raise ValueError('Player not found!')
+        if roll not in (1, 2, 3, 4, 5, 6):
+            raise ValueError('Invalid roll: %r' % (roll,))
+        game.play_turn(player, roll)
+        if winner is None and player.get_completed() is True:
+            winner = pos
+    return game.get_spaces(), winner
+
+
+@contextlib.contextmanager
+def _open_log(path):
+    """Map a log file read-only into memory, giving None for an empty file (mmap can't map 0 bytes)."""
+    with open(path, 'rb') as log_file:
+        if not os.fstat(log_file.fileno()).st_size:
+            yield None
+            return
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as log:
+            yield log
+
+
+def _log_format(log):
+    """Return 'binary' if the mapped log starts with the binary log header, else 'jsonl'."""
+    return 'binary' if log[:len(_LOG_HEADER)] == _LOG_HEADER else 'jsonl'
+
+
+def _iter_games(log, log_format, start, end):
+    """
+    Yield the (players list, turns list) of the games of the mapped log between bytes start and end. A JSONL line
+    or binary record that is not a valid game yields (None, error message) so one bad game does not stop a replay.
+    A binary record cut short by the end of the file is the last one, nothing after it can be read.
+    """
+    if log_format == 'binary':
+        offset = max(start, len(_LOG_HEADER))
+        while offset < end:
+            if offset + _GAME_HEADER.size > len(log):
+                yield None, 'Invalid game at byte %d: the record is truncated' % offset
+                return
+            mask, count = _GAME_HEADER.unpack_from(log, offset)
+            record_offset = offset
+            offset += _GAME_HEADER.size + count
+            if offset > len(log):
+                yield None, 'Invalid game at byte %d: the record is truncated' % record_offset
+                return
+            turn_bytes = log[offset - count:offset]
+            if max(turn_bytes, default=0) >= len(_TURN_CODES):
+                yield None, 'Invalid game at byte %d: a turn is not a position and roll' % record_offset
+                continue
+            turns = [_TURN_CODES[code] for code in turn_bytes]
+            if None in turns:
+                yield None, 'Invalid game at byte %d: a roll is not 1 to 6' % record_offset
+                continue
+            yield [pos for index, pos in enumerate(_POSITIONS) if mask >> index & 1], turns
+        return
+
+    offset = start
+    while offset < end:
+        line_end = log.find(b'\n', offset, end)
+        if line_end == -1:
+            line_end = end
+        line = log[offset:line_end]
+        offset = line_end + 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            yield record['players'], [(pos, roll) for pos, roll in record['turns']]
+        except (ValueError, KeyError, TypeError) as error:
+            yield None, 'Invalid game: %s' % error
+
+
+def _chunk_bounds(log, log_format, chunk_size):
+    """
+    Split the mapped log into (start, end) byte ranges of about chunk_size that begin at a game. A truncated last
+    binary record goes in the last range, where _iter_games reports it.
+    """
+    bounds = []
+    if log_format == 'binary':
+        start = offset = len(_LOG_HEADER)
+        while offset + _GAME_HEADER.size <= len(log):
+            offset += _GAME_HEADER.size + _GAME_HEADER.unpack_from(log, offset)[1]
+            if offset >= len(log):
+                break
+            if offset - start >= chunk_size:
+                bounds.append((start, offset))
+                start = offset
+    else:
+        start = 0
+        while start + chunk_size < len(log):
+            # the chunk ends after the first line ending past chunk_size bytes
+            line_end = log.find(b'\n', start + chunk_size)
+            if line_end == -1:
+                break
+            bounds.append((start, line_end + 1))
+            start = line_end + 1
+    if start < len(log):
+        bounds.append((start, len(log)))
+    return bounds
+
+
+def _replay_chunk(task):
+    """
+    Replay the games of one byte range of a log, in a worker process or not, and return a list with an
+    (error message, token spaces, winner, number of turns) tuple for each game.
+    """
+    path, log_format, start, end, cache_size = task
+    transition_cache = TransitionCache(cache_size) if cache_size else None
+    results = []
+    with _open_log(path) as log:
+        for players, turns in _iter_games(log, log_format, start, end):
+            if players is None:
+                results.append((turns, None, None, 0))
+                continue
+            try:
+                spaces, winner = replay_game(players, turns, transition_cache)
+            except (ValueError, TypeError, IndexError) as error:
+                results.append(('Invalid game: %s' % error, None, None, len(turns)))
+                continue
+            results.append((None, spaces, winner, len(turns)))
+    return results
+
+
+def _peak_memory():
+    """Return the peak resident memory of this process and its finished workers in MiB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def replay_log(path, output, workers=1, chunk_size=_CHUNK_SIZE, cache_size=0):
+    """
+    Replay every game of the log at path and write one JSON line per game to the output file object: the game's
+    index and its final token spaces, first finisher and number of turns, or the error that stopped it. Chunks of
+    about chunk_size bytes are replayed on workers processes (in this process if 1) and written in log order. If
+    cache_size is not 0 each chunk replays through a TransitionCache of that size. Return a dict of statistics.
+    """
+    with _open_log(path) as log:
+        if log is None:
+            log_format, bounds = 'jsonl', []
+        else:
+            log_format = _log_format(log)
+            bounds = _chunk_bounds(log, log_format, chunk_size)
+    tasks = [(path, log_format, start, end, cache_size) for start, end in bounds]
+    stats = {'format': log_format, 'games': 0, 'turns': 0, 'errors': 0, 'wins': {pos: 0 for pos in _POSITIONS},
+             'startup_seconds': time.perf_counter() - _STARTED}
+
+    replay_started = time.perf_counter()
+    if workers == 1:
+        chunk_results = map(_replay_chunk, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        chunk_results = pool.imap(_replay_chunk, tasks)
+    try:
+        for results in chunk_results:
+            lines = []
+            for error, spaces, winner, turns in results:
+                if error is None:
+                    lines.append(json.dumps({'game': stats['games'], 'spaces': spaces, 'winner': winner,
+                                             'turns': turns}))
+                    if winner is not None:
+                        stats['wins'][winner] += 1
+                else:
+                    lines.append(json.dumps({'game': stats['games'], 'error': error}))
+                    stats['errors'] += 1
+                stats['games'] += 1
+                stats['turns'] += turns
+            lines.append('')
+            output.write('\n'.join(lines))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - replay_started
+    stats['replay_seconds'] = elapsed
+    stats['turns_per_second'] = stats['turns'] / elapsed if elapsed else 0.0
+    stats['peak_memory_mib'] = _peak_memory()
+    return stats
+
+
+def main():
+    """Replay a log from the command line, writing the games to a file or stdout and the statistics to stderr."""
+    parser = argparse.ArgumentParser(description='Replay Ludo games from a JSONL or binary turn log.')
+    parser.add_argument('log', help='JSONL log with a {"players": [...], "turns": [[pos, roll], ...]} line per game,'
+                                    ' or a binary log')
+    parser.add_argument('--output', default='-', help='file for one JSON line per game (default: stdout)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (default: 1, no workers)')
+    parser.add_argument('--chunk-size', type=int, default=_CHUNK_SIZE, help='bytes of log replayed per task')
+    parser.add_argument('--cache-size', type=int, default=0, help='turns kept in a transition cache (default: none)')
+    parser.add_argument('--to-binary', default=None,
+                        help='convert the log to a binary log at this path, skipping invalid games, and exit')
+    args = parser.parse_args()
+
+    if args.to_binary is not None:
+        print(json.dumps(convert_log(args.log, args.to_binary)), file=sys.stderr)
+        return
+
+    if args.output == '-':
+        stats = replay_log(args.log, sys.stdout, args.workers, args.chunk_size, args.cache_size)
+    else:
+        with open(args.output, 'w', buffering=1 << 20) as output:
+            stats = replay_log(args.log, output, args.workers, args.chunk_size, args.cache_size)
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Configurable Ludo rules compiled into lookup tables, and a generic engine that plays any of them
+
+from LudoGame import _START_END_SPACES
+
+# names of the tokens of a player, in the order the rules try them
+_TOKEN_NAMES = 'pqrstuvw'
+
+# highest roll of the die
+_MAX_ROLL = 6
+
+# most entries of a compiled decision table: every combination of a player's token steps times the rolls 0 to 6,
+# which holds two tokens on any track (59 * 59 * 7 for the default board) but not three or more
+_MAX_DECISIONS = 1 << 18
+
+
+class RulesConfig:
+    """
+    Represents a set of house rules: the positions and the board space each one starts on, the number of spaces
+    around the board, how many steps a token goes around it before turning into its home squares, the number of
+    home squares before 'E', tokens per player, the roll that lets a token leave Home, whether a token that
+    overshoots 'E' bounces back (or can't move), and board spaces where tokens are safe from kicks. The default
+    configuration is the game LudoGame plays.
+    """
+
+    def __init__(self, start_spaces=None, board_size=56, track_length=50, home_length=6, tokens=2, leave_roll=6,
+                 bounce_back=True, safe_spaces=()):
+        """Initialize the rules, start_spaces is a dict of position -> start space ('A' 1 ... 'D' 43 if None)."""
+        if start_spaces is None:
+            start_spaces = {pos: start_space for pos, (start_space, _) in _START_END_SPACES.items()}
+        if not 1 <= tokens <= len(_TOKEN_NAMES):
+            raise ValueError('A player can have 1 to %d tokens!' % len(_TOKEN_NAMES))
+        if not 1 <= track_length <= board_size or home_length < 0:
+            raise ValueError('Invalid track!')
+        if not 1 <= leave_roll <= _MAX_ROLL:
+            raise ValueError('The leave roll must be 1 to %d!' % _MAX_ROLL)
+        if not start_spaces or any(not 1 <= space <= board_size for space in start_spaces.values()):
+            raise ValueError('Start spaces must be board spaces 1 to %d!' % board_size)
+        if any(not 1 <= space <= board_size for space in safe_spaces):
+            raise ValueError('Safe spaces must be board spaces 1 to %d!' % board_size)
+        self._start_spaces = dict(start_spaces)
+        self._board_size = board_size
+        self._track_length = track_length
+        self._home_length = home_length
+        self._tokens = tokens
+        self._leave_roll = leave_roll
+        self._bounce_back = bounce_back
+        self._safe_spaces = frozenset(safe_spaces)
+
+    def get_start_spaces(self):
+        """Return the dict of position -> start space."""
+        return dict(self._start_spaces)
+
+    def get_board_size(self):
+        """Return the number of spaces around the board."""
+        return self._board_size
+
+    def get_track_length(self):
+        """Return the steps a token goes around the board before its home squares."""
+        return self._track_length
+
+    def get_home_length(self):
+        """Return the number of home squares before 'E'."""
+        return self._home_length
+
+    def get_tokens(self):
+        """Return the number of tokens of a player."""
+        return self._tokens
+
+    def get_leave_roll(self):
+        """Return the roll that lets a token leave Home."""
+        return self._leave_roll
+
+    def get_bounce_back(self):
+        """Return True if a token that overshoots 'E' bounces back, False if it can't move."""
+        return self._bounce_back
+
+    def get_safe_spaces(self):
+        """Return the set of board spaces where tokens can't be kicked."""
+        return self._safe_spaces
+
+    def get_end_step(self):
+        """Return the total steps of a token at 'E'."""
+        return self._track_length + self._home_length + 1
+
+    def compile(self):
+        """Return the CompiledRules of the configuration."""
+        return CompiledRules(self)
+
+
+class CompiledRules:
+    """
+    Represents a RulesConfig compiled into lookup tables, built once and shared by every game played with it:
+    the space name and board square of each position's steps (None off the shared board, on home squares and 'E',
+    and on safe spaces), the step a token lands on for every step and roll (with the bounce back, or None if it
+    can't move), and a decision table of the rule ladder for every combination of a player's token steps and
+    roll. The decision table is built when it has at most _MAX_DECISIONS entries, which covers two tokens on any
+    track; with more tokens the ladder runs on every turn instead. Tables are indexed by steps + 1 like the maps
+    of LudoGame, so 'H' is at index 0.
+    """
+
+    def __init__(self, config):
+        """Compile the tables of config."""
+        self._config = config
+        self._positions = list(config.get_start_spaces())
+        self._tokens = config.get_tokens()
+        self._leave_roll = config.get_leave_roll()
+        self._end_step = config.get_end_step()
+        self._track_length = config.get_track_length()
+        end_step = self._end_step
+        board_size = config.get_board_size()
+
+        # step + 1 -> step after each roll, a flat tuple indexed by (step + 1) * (_MAX_ROLL + 1) + roll
+        move_to = []
+        for step in range(-1, end_step + 1):
+            for roll in range(_MAX_ROLL + 1):
+                if step == -1:
+                    new_step = 0 if roll == self._leave_roll else None
+                elif step + roll <= end_step:
+                    new_step = step + roll
+                elif config.get_bounce_back():
+                    new_step = 2 * end_step - step - roll
+                else:
+                    new_step = None
+                move_to.append(new_step)
+        self._move_to = tuple(move_to)
+
+        self._spaces = {}
+        self._squares = {}
+        for pos, start_space in config.get_start_spaces().items():
+            board_spaces = [(start_space - 1 + step) % board_size + 1 for step in range(self._track_length)]
+            home_spaces = [pos + str(step) for step in range(1, config.get_home_length() + 1)]
+            self._spaces[pos] = tuple(['H', 'R'] + [str(space) for space in board_spaces] + home_spaces + ['E'])
+            # board square each step is on, where an opponent could be kicked
+            squares = [None, None] + [None if space in config.get_safe_spaces() else space for space in board_spaces]
+            self._squares[pos] = tuple(squares + [None] * (config.get_home_length() + 1))
+
+        # decision of every combination of token steps (as digits + 1 of a number in base end_step + 2) and roll
+        self._width = end_step + 2
+        self._decisions = None
+        if self._width ** self._tokens * (_MAX_ROLL + 1) <= _MAX_DECISIONS:
+            decisions = []
+            for code in range(self._width ** self._tokens):
+                steps = []
+                for _ in range(self._tokens):
+                    code, digit = divmod(code, self._width)
+                    steps.append(digit - 1)
+                steps = tuple(reversed(steps))
+                decisions.append(None)
+                for roll in range(1, _MAX_ROLL + 1):
+                    decisions.append(self.decide(steps, roll))
+            self._decisions = tuple(decisions)
+
+    def get_config(self):
+        """Return the RulesConfig the rules were compiled from."""
+        return self._config
+
+    def get_positions(self):
+        """Return the list of positions, in the order players are listed in a game."""
+        return list(self._positions)
+
+    def get_tokens(self):
+        """Return the number of tokens of a player."""
+        return self._tokens
+
+    def get_leave_roll(self):
+        """Return the roll that lets a token leave Home."""
+        return self._leave_roll
+
+    def get_end_step(self):
+        """Return the total steps of a token at 'E'."""
+        return self._end_step
+
+    def has_decision_table(self):
+        """Return True if the decision ladder was compiled into a table."""
+        return self._decisions is not None
+
+    def get_move_to(self, step, roll):
+        """Return the steps of a token at step after moving roll, or None if it can't move."""
+        return self._move_to[(step + 1) * (_MAX_ROLL + 1) + roll]
+
+    def get_square(self, pos, step):
+        """Return the board square a token of pos at step is on, None if it can't be kicked there."""
+        return self._squares[pos][step + 1]
+
+    def get_space_name(self, pos, step):
+        """Return the name of the space of a token of pos at step."""
+        return self._spaces[pos][step + 1]
+
+    def get_decision(self, steps, roll):
+        """Return decide(steps, roll) for a sequence of token steps, from the decision table if there is one."""
+        if self._decisions is None:
+            return self.decide(tuple(steps), roll)
+        code = 0
+        for step in steps:
+            code = code * self._width + step + 1
+        return self._decisions[code * (_MAX_ROLL + 1) + roll]
+
+    def decide(self, steps, roll):
+        """
+        Run the rule ladder (see RulesEngine) for a player with a tuple of token steps and a roll, without looking
+        at opponents. Return (new steps tuple, rule, kicks): the turn when nothing is kicked, and the tuple of
+        (step, landing step) of the stacks that would kick an opponent on their landing square, in the order the
+        kick rule tries them, empty if an earlier rule decides the turn.
+        """
+        end_step = self._end_step
+        if all(step == end_step for step in steps):
+            return steps, 'complete', ()
+
+        # 1st rule, leave Home on the leave roll
+        if roll == self._leave_roll and -1 in steps:
+            new_steps = list(steps)
+            new_steps[steps.index(-1)] = 0
+            return tuple(new_steps), 'leave_home', ()
+
+        # stacks that can move, as the list of (first token, step) in token order, tokens at 'R' are never stacked
+        stacks = []
+        for token, step in enumerate(steps):
+            if step == -1 or self.get_move_to(step, roll) is None:
+                continue
+            if step > 0 and step in steps[:token]:
+                continue
+            stacks.append((token, step))
+        if not stacks:
+            return steps, 'no_move', ()
+
+        # 2nd rule, finish on an exact roll
+        for token, step in stacks:
+            if step + roll == end_step:
+                return self._move(steps, token, step, roll), 'exact_finish', ()
+
+        # 3rd rule, the stacks landing on the shared board, checked for opponents when the turn is played
+        kicks = []
+        for token, step in stacks:
+            new_step = self.get_move_to(step, roll)
+            if 1 <= new_step <= self._track_length:
+                kicks.append((step, new_step))
+
+        # 4th rule, move the stack with the lowest step count
+        if roll == self._leave_roll:
+            token, step = min(reversed(stacks), key=lambda stack: stack[1])
+        else:
+            token, step = min(stacks, key=lambda stack: stack[1])
+        return self._move(steps, token, step, roll), 'lower_count', tuple(kicks)
+
+    def _move(self, steps, token, step, roll):
+        """Return steps with token and the tokens stacked with it (tokens at 'R' are not stacked) moved by roll."""
+        new_step = self.get_move_to(step, roll)
+        if step == 0:
+            return steps[:token] + (new_step,) + steps[token + 1:]
+        return tuple(new_step if other_step == step else other_step for other_step in steps)
+
+
+class RulesEngine:
+    """
+    Represents a game played by any CompiledRules, with the decision ladder of LudoGame.priority generalized to
+    any number of tokens. A player's tokens on the same space of the board are stacked and move together (tokens
+    at 'R' never are), and with a roll the player takes the first move of:
+
+    1. if the roll is the leave roll, get the first token in Home out to 'R'
+    2. move a stack that reaches 'E' on the exact roll
+    3. move a stack onto an opponent and send every opponent token on that square home; tokens on the same space
+       as the stack (two tokens at 'R') move with it
+    4. move the stack with the lowest step count, ties going to the last token on the leave roll and to the first
+       token on other rolls
+
+    Only stacks that can move take part, and a finished token can still be moved back when it is the only one
+    that can, as in LudoGame. With the default RulesConfig every game ends exactly like in LudoGame. A turn is a
+    lookup in the compiled decision table, and the opponents are only looked at when the entry has stacks that
+    could kick.
+    """
+
+    def __init__(self, rules=None):
+        """Initialize the engine with CompiledRules (the default configuration if None)."""
+        self._rules = rules if rules is not None else RulesConfig().compile()
+        self._steps = {}        # position -> list of the steps of each token
+
+    def start_game(self, players):
+        """Start a game between the players list with every token in Home."""
+        self._steps = {pos: [-1] * self._rules.get_tokens() for pos in self._rules.get_positions() if pos in players}
+
+    def play_game(self, players, turns):
+        """Start a game, play the list of (position, roll) turns and return the token spaces, like LudoGame."""
+        self.start_game(players)
+        for pos, roll in turns:
+            self.play_turn(pos, roll)
+        return self.get_spaces()
+
+    def get_steps(self, pos):
+        """Return the tuple of the steps of each token of the player at pos."""
+        return tuple(self._get_tokens(pos))
+
+    def get_completed(self, pos):
+        """Return True if every token of the player at pos is at 'E'."""
+        return all(step == self._rules.get_end_step() for step in self._get_tokens(pos))
+
+    def get_spaces(self):
+        """Return the list of the spaces of every token of every player, in the order of LudoGame."""
+        rules = self._rules
+        return [rules.get_space_name(pos, step) for pos, steps in self._steps.items() for step in steps]
+
+    def _get_tokens(self, pos):
+        """Return the list of the steps of the tokens of the player at pos."""
+        if pos not in self._steps:
+            raise ValueError('Player not found!')
+        return self._steps[pos]
+
+    def play_turn(self, pos, roll):
+        """
+        Play one roll of the player at pos and return the name of the rule that decided it: 'complete',
+        'no_move', 'leave_home', 'exact_finish', 'kick' or 'lower_count'.
+        """
+        if roll not in (1, 2, 3, 4, 5, 6):
+            raise ValueError('Invalid roll!')
+        rules = self._rules
+        steps = self._get_tokens(pos)
+        new_steps, rule, kicks = rules.get_decision(steps, roll)
+
+        # 3rd rule, kick the opponents on the square a stack lands on
+        if kicks:
+            opponents = {}      # board square -> list of (position, token) of opponents on it
+            for other, other_steps in self._steps.items():
+                if other != pos:
+                    for other_token, other_step in enumerate(other_steps):
+                        square = rules.get_square(other, other_step)
+                        if square is not None:
+                            opponents.setdefault(square, []).append((other, other_token))
+            for step, new_step in kicks:
+                kicked = opponents.get(rules.get_square(pos, new_step))
+                if kicked:
+                    for other, other_token in kicked:
+                        self._steps[other][other_token] = -1
+                    # every token on the stack's space moves, including a second token at 'R'
+                    for token, token_step in enumerate(steps):
+                        if token_step == step:
+                            steps[token] = new_step
+                    return 'kick'
+
+        steps[:] = new_steps
+        return rule
@@ -0,0 +1,283 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Forkable Ludo game states, pluggable move policies and a Monte Carlo rollout search player
+
+import argparse
+import math
+import random
+import time
+
+from LudoGame import LudoGame, advance_turn, unpack_steps, _POSITIONS
+
+# game every GameState is played on to work out the next state, restored from the state's packed integer each time
+_scratch_game = LudoGame()
+
+
+class GameState:
+    """
+    Represents an immutable snapshot of a game: the positions of all tokens packed into one integer (see
+    pack_steps). Forking a state is free since states are never changed: playing a move returns a new state, so
+    any number of what-if branches share the states they came from. Moves are played on one scratch LudoGame
+    restored from the packed integer, so no Player objects are copied (which also means states are not thread
+    safe).
+    """
+
+    __slots__ = ('_packed',)
+
+    def __init__(self, packed):
+        """Initialize a state from a game packed by pack_steps."""
+        self._packed = packed
+
+    @classmethod
+    def from_game(cls, game):
+        """Return the state of a LudoGame."""
+        return cls(game.get_packed_state())
+
+    def get_packed(self):
+        """Return the packed integer of the state."""
+        return self._packed
+
+    def get_steps(self):
+        """Return a dict of position -> (steps p, steps q) of the players in the state."""
+        return unpack_steps(self._packed)
+
+    def get_positions(self):
+        """Return the list of positions playing, in the order of LudoGame."""
+        return list(unpack_steps(self._packed))
+
+    def get_completed(self, pos):
+        """Return True if the player at pos has both tokens at 'E'."""
+        return unpack_steps(self._packed)[pos] == (57, 57)
+
+    def fork(self):
+        """Return a branch of the state to play what-if moves on, which is the state itself since it is immutable."""
+        return self
+
+    def restore(self, game=None):
+        """Restore the state into game (a new LudoGame if None) and return it."""
+        if game is None:
+            game = LudoGame()
+        game.set_packed_state(self._packed)
+        return game
+
+    def get_actions(self, pos, roll):
+        """Return the moves the player at pos can make with roll, like LudoGame.get_actions."""
+        _scratch_game.set_packed_state(self._packed)
+        return _scratch_game.get_actions(_scratch_game.get_player_by_position(pos), roll)
+
+    def play_action(self, pos, action, roll):
+        """Return the state after the player at pos makes a move returned by get_actions with roll."""
+        _scratch_game.set_packed_state(self._packed)
+        _scratch_game.play_action(_scratch_game.get_player_by_position(pos), action, roll)
+        return GameState(_scratch_game.get_packed_state())
+
+    def play_priority(self, pos, roll):
+        """Return the state after the player at pos plays roll by the priority rule."""
+        _scratch_game.set_packed_state(self._packed)
+        _scratch_game.priority(_scratch_game.get_player_by_position(pos), roll)
+        return GameState(_scratch_game.get_packed_state())
+
+
+class Policy:
+    """
+    Represents a move policy that LudoGame.play_game can use in place of the priority rule. A policy plays a turn
+    with play(game, player, steps); subclasses choose a move from game.get_actions in choose_action, or override
+    play to move the tokens some other way.
+    """
+
+    def choose_action(self, game, player, steps):
+        """Return the move of game.get_actions(player, steps) to make, or None if there is none."""
+        raise NotImplementedError
+
+    def play(self, game, player, steps):
+        """Play one roll of player in game with the move choose_action picks."""
+        action = self.choose_action(game, player, steps)
+        if action is not None:
+            game.play_action(player, action, steps)
+
+
+class PriorityPolicy(Policy):
+    """Represents the built-in priority rule of LudoGame as a policy, with all its tie breaks."""
+
+    def choose_action(self, game, player, steps):
+        """
+        Return the move of game.get_actions that ends where the priority rule does, or None if the rule makes no
+        move or one get_actions does not list (moving a finished token back). The game is left as it was.
+        """
+        packed = game.get_packed_state()
+        game.priority(player, steps)
+        wanted = game.get_packed_state()
+        game.set_packed_state(packed)
+        if wanted == packed:
+            return None
+        for action in game.get_actions(player, steps):
+            game.play_action(player, action, steps)
+            reached = game.get_packed_state()
+            game.set_packed_state(packed)
+            if reached == wanted:
+                return action
+        return None
+
+    def play(self, game, player, steps):
+        """Play one roll of player by LudoGame.priority."""
+        game.priority(player, steps)
+
+
+class RandomPolicy(Policy):
+    """Represents a policy making a random move, from its own random generator."""
+
+    def __init__(self, seed=None):
+        """Initialize the policy with a random generator seeded with seed."""
+        self._rng = random.Random(seed)
+
+    def choose_action(self, game, player, steps):
+        """Return a random move, or None if there is none."""
+        actions = game.get_actions(player, steps)
+        return self._rng.choice(actions) if actions else None
+
+
+class RolloutEngine:
+    """
+    Represents a Monte Carlo search scoring the moves of one roll by random rollouts within a time budget. Each
+    candidate move is played on a fork of the game state, and the game is then played out from it with random
+    rolls and rollout_policy for every player until someone finishes (or max_turns). Rollouts are spread over the
+    moves by UCB1, so more of the budget goes to the moves that look best, and a move's score is the share of its
+    rollouts the moving player won. Rolls follow the turn model of the tournament: players roll in order and a 6
+    earns one bonus roll.
+    """
+
+    def __init__(self, time_budget=0.05, rollout_policy=None, max_turns=500, exploration=1.4, seed=None):
+        """Initialize the engine with a time budget in seconds per decision."""
+        self._time_budget = time_budget
+        self._rollout_policy = rollout_policy if rollout_policy is not None else PriorityPolicy()
+        self._max_turns = max_turns
+        self._exploration = exploration
+        self._rng = random.Random(seed)
+        self._game = LudoGame()     # game rollouts are played on, restored from a fork for every rollout
+        self._rollouts = 0
+
+    def score_actions(self, state, pos, roll, bonus_roll=False):
+        """
+        Score the moves of the player at pos with roll in a GameState, bonus_roll True if roll is a bonus roll.
+        Return a dict of move -> (rollouts won, rollouts played).
+        """
+        actions = state.get_actions(pos, roll)
+        if not actions:
+            return {}
+        forks = [state.fork().play_action(pos, action, roll) for action in actions]
+        wins = [0] * len(actions)
+        plays = [0] * len(actions)
+        total = 0
+        deadline = time.perf_counter() + self._time_budget
+        # every move gets one rollout, then the budget goes by UCB1 until it runs out
+        while total < len(actions) or time.perf_counter() < deadline:
+            if total < len(actions):
+                best = total
+            else:
+                log_total = math.log(total)
+                best = max(range(len(actions)), key=lambda index: wins[index] / plays[index] + self._exploration
+                           * math.sqrt(log_total / plays[index]))
+            if self._rollout(forks[best], pos, roll, bonus_roll) == pos:
+                wins[best] += 1
+            plays[best] += 1
+            total += 1
+        self._rollouts += total
+        return {action: (wins[index], plays[index]) for index, action in enumerate(actions)}
+
+    def choose_action(self, state, pos, roll, bonus_roll=False):
+        """Return the move with the best share of won rollouts, or None if the player can't move."""
+        scores = self.score_actions(state, pos, roll, bonus_roll)
+        if not scores:
+            return None
+        return max(scores, key=lambda action: scores[action][0] / scores[action][1])
+
+    def get_rollouts(self):
+        """Return the number of rollouts played by the engine."""
+        return self._rollouts
+
+    def _rollout(self, state, pos, roll, bonus_roll):
+        """
+        Play out the game from state, reached by the player at pos moving with roll, and return the position that
+        finished first, or None if nobody finished within max_turns.
+        """
+        game = state.restore(self._game)
+        if game.get_player_by_position(pos).get_completed() is True:
+            return pos
+        order = list(unpack_steps(state.get_packed()))
+        rng = self._rng
+        play = self._rollout_policy.play
+
+        # the next roll is the bonus roll of pos after a 6, else the roll of the next player
+        current, bonus = advance_turn(order, order.index(pos), roll, bonus_roll)
+        for _ in range(self._max_turns):
+            player = game.get_player_by_position(order[current])
+            roll = rng.randint(1, 6)
+            play(game, player, roll)
+            if player.get_completed() is True:
+                return order[current]
+            current, bonus = advance_turn(order, current, roll, bonus)
+        return None
+
+
+class SearchPolicy(Policy):
+    """Represents a policy choosing each move by a RolloutEngine search, when there is more than one to choose."""
+
+    def __init__(self, engine=None):
+        """Initialize the policy with a RolloutEngine (a new one with default settings if None)."""
+        self._engine = engine if engine is not None else RolloutEngine()
+
+    def choose_action(self, game, player, steps):
+        """Return the move the search scores best. play_game does not tell whether a roll is a bonus roll."""
+        actions = game.get_actions(player, steps)
+        if len(actions) <= 1:
+            return actions[0] if actions else None
+        return self._engine.choose_action(GameState.from_game(game), player.get_position(), steps)
+
+
+def play_match(policies, games, seed=0, max_turns=2000):
+    """
+    Play games random games between policies, a dict of position -> policy, with the turn model of the
+    tournament, and return a dict of games each position finished first (None counting unfinished games).
+    """
+    order = [pos for pos in _POSITIONS if pos in policies]
+    wins = {pos: 0 for pos in order}
+    wins[None] = 0
+    for index in range(games):
+        rng = random.Random('%s-%d' % (seed, index))
+        game = LudoGame()
+        game.start_game(order)
+        winner = None
+        current = 0
+        bonus = False
+        for _ in range(max_turns):
+            pos = order[current]
+            player = game.get_player_by_position(pos)
+            roll = rng.randint(1, 6)
+            policies[pos].play(game, player, roll)
+            if player.get_completed() is True:
+                winner = pos
+                break
+            current, bonus = advance_turn(order, current, roll, bonus)
+        wins[winner] += 1
+    return wins
+
+
+def main():
+    """Play a search player against the priority rule from the command line and print the wins."""
+    parser = argparse.ArgumentParser(description='Play a Monte Carlo search player against the priority rule.')
+    parser.add_argument('--games', type=int, default=20, help='games to play')
+    parser.add_argument('--budget', type=float, default=0.02, help='seconds of search per decision')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the dice rolls')
+    args = parser.parse_args()
+
+    engine = RolloutEngine(args.budget, seed=args.seed)
+    policies = {'A': SearchPolicy(engine), 'C': PriorityPolicy()}
+    started = time.perf_counter()
+    wins = play_match(policies, args.games, args.seed)
+    elapsed = time.perf_counter() - started
+    print('search (A) wins %d, priority (C) wins %d, unfinished %d' % (wins['A'], wins['C'], wins[None]))
+    print('%d rollouts in %.1f s' % (engine.get_rollouts(), elapsed))
+
+
+if __name__ == '__main__':
+    main()
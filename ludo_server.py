@@ -0,0 +1,302 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Host many Ludo games at once behind an asyncio socket server, with a load generator client
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from LudoGame import LudoGame, PackedGames, _POSITIONS
+
+
+class _Session:
+    """Represents a game held in memory: the LudoGame, the number of turns played and when it was last used."""
+
+    __slots__ = ('game', 'turns', 'last_used')
+
+    def __init__(self, game, turns, last_used):
+        """Initialize the session."""
+        self.game = game
+        self.turns = turns
+        self.last_used = last_used
+
+
+class GameHost:
+    """
+    Represents the games hosted by a server, each with an integer game id. Requests are handled synchronously to
+    completion, so on an asyncio server the turns of one game are played one at a time in the order they arrive
+    while requests for different games from different connections interleave. Games not used for idle_seconds are
+    evicted to a packed snapshot of 8 bytes (see PackedGames) and restored the next time they are used.
+    """
+
+    def __init__(self, idle_seconds=60.0):
+        """Initialize a host without games."""
+        self._idle_seconds = idle_seconds
+        self._sessions = {}                 # game id -> _Session of games in memory
+        self._snapshots = PackedGames()     # packed games of evicted sessions
+        self._evicted = {}                  # game id -> (index in _snapshots, turns played) of evicted games
+        self._free_slots = []               # indexes in _snapshots no longer used
+        self._next_id = 1
+        self._turns = 0
+        self._evictions = 0
+        self._restores = 0
+
+    def create_game(self, players):
+        """Start a game between the players list and return its game id."""
+        if not players or any(pos not in _POSITIONS for pos in players):
+            raise ValueError('Invalid players!')
+        game = LudoGame()
+        game.start_game(list(players))
+        game_id = self._next_id
+        self._next_id += 1
+        self._sessions[game_id] = _Session(game, 0, time.monotonic())
+        return game_id
+
+    def play_turn(self, game_id, player_pos, roll):
+        """Play one roll of the game and return the list of token spaces after it and the number of turns played."""
+        if roll not in (1, 2, 3, 4, 5, 6):
+            raise ValueError('Invalid roll!')
+        session = self._get_session(game_id)
+        player = session.game.get_player_by_position(player_pos)
+        if player == 'Player not found!':
+            raise ValueError('Player not found!')
+        session.game.play_turn(player, roll)
+        session.turns += 1
+        self._turns += 1
+        return session.game.get_spaces(), session.turns
+
+    def get_spaces(self, game_id):
+        """Return the list of token spaces of the game."""
+        return self._get_session(game_id).game.get_spaces()
+
+    def close_game(self, game_id):
+        """Remove the game."""
+        if game_id in self._sessions:
+            del self._sessions[game_id]
+        elif game_id in self._evicted:
+            self._free_slots.append(self._evicted.pop(game_id)[0])
+        else:
+            raise ValueError('Game not found!')
+
+    def evict_idle(self, now=None):
+        """Evict the games not used for idle_seconds to packed snapshots and return how many were evicted."""
+        if now is None:
+            now = time.monotonic()
+        idle = [game_id for game_id, session in self._sessions.items()
+                if now - session.last_used >= self._idle_seconds]
+        for game_id in idle:
+            session = self._sessions.pop(game_id)
+            packed = session.game.get_packed_state()
+            if self._free_slots:
+                index = self._free_slots.pop()
+                self._snapshots[index] = packed
+            else:
+                index = self._snapshots.add_game(session.game)
+            self._evicted[game_id] = (index, session.turns)
+        self._evictions += len(idle)
+        return len(idle)
+
+    def _get_session(self, game_id):
+        """Return the session of the game, restoring it from its snapshot if it was evicted."""
+        session = self._sessions.get(game_id)
+        if session is None:
+            if game_id not in self._evicted:
+                raise ValueError('Game not found!')
+            index, turns = self._evicted.pop(game_id)
+            session = _Session(self._snapshots.restore_game(index), turns, 0.0)
+            self._free_slots.append(index)
+            self._sessions[game_id] = session
+            self._restores += 1
+        session.last_used = time.monotonic()
+        return session
+
+    def get_stats(self):
+        """Return a dict of the games in memory and evicted, turns played, evictions and restores."""
+        return {'games': len(self._sessions), 'evicted': len(self._evicted), 'turns': self._turns,
+                'evictions': self._evictions, 'restores': self._restores}
+
+    def handle_request(self, request):
+        """
+        Handle one request dict and return the reply dict. Requests have an 'op' of 'create' (with 'players'),
+        'turn' (with 'game', 'pos' and 'roll'), 'state' or 'close' (with 'game'), or 'stats', and an optional
+        'id' copied into the reply so a client can match replies to pipelined requests.
+        """
+        reply = {'id': request.get('id')}
+        op = request.get('op')
+        if op == 'turn':
+            reply['spaces'], reply['turns'] = self.play_turn(request['game'], request['pos'], request['roll'])
+        elif op == 'create':
+            reply['game'] = self.create_game(request['players'])
+        elif op == 'state':
+            reply['spaces'] = self.get_spaces(request['game'])
+        elif op == 'close':
+            self.close_game(request['game'])
+        elif op == 'stats':
+            reply['stats'] = self.get_stats()
+        else:
+            raise ValueError('Unknown op!')
+        return reply
+
+    def _reply(self, line):
+        """Return the JSON reply to one request line, or an error reply if the request failed."""
+        request = None
+        try:
+            request = json.loads(line)
+            return json.dumps(self.handle_request(request))
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            request_id = request.get('id') if isinstance(request, dict) else None
+            return json.dumps({'id': request_id, 'error': str(error)})
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve one connection of newline-delimited JSON requests. Every request line read in one go is handled and
+        the replies are written back together, so pipelined requests are acknowledged in batches.
+        """
+        pending = b''
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()
+                replies = [self._reply(line) for line in lines if line.strip()]
+                if replies:
+                    replies.append('')
+                    writer.write('\n'.join(replies).encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def sweep(self, interval):
+        """Evict idle games every interval seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+
+async def start_server(host, address='127.0.0.1', port=8765, unix_path=None, sweep_seconds=5.0):
+    """
+    Start serving host on a TCP address and port (port 0 picks a free one) or on a Unix socket at unix_path, with
+    idle games swept every sweep_seconds. Return the asyncio server and the sweeping task.
+    """
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(host.handle_connection, unix_path)
+    else:
+        server = await asyncio.start_server(host.handle_connection, address, port)
+    sweeper = asyncio.ensure_future(host.sweep(sweep_seconds))
+    return server, sweeper
+
+
+async def _drive_connection(address, port, games, turns, seed, latencies):
+    """
+    Create games games on one connection and play turns rounds of one turn in each of them, the turns of a round
+    pipelined together. Add the latency of every turn, from sending its round to reading its reply, to latencies.
+    """
+    reader, writer = await asyncio.open_connection(address, port)
+    rng = random.Random(seed)
+    players = [sorted(rng.sample(_POSITIONS, rng.randint(2, 4))) for _ in range(games)]
+    writer.write(''.join(json.dumps({'id': index, 'op': 'create', 'players': game_players}) + '\n'
+                         for index, game_players in enumerate(players)).encode())
+    game_ids = [None] * games
+    for _ in range(games):
+        reply = json.loads(await reader.readline())
+        game_ids[reply['id']] = reply['game']
+
+    for turn in range(turns):
+        requests = [json.dumps({'id': index, 'op': 'turn', 'game': game_id,
+                                'pos': players[index][turn % len(players[index])], 'roll': rng.randint(1, 6)})
+                    for index, game_id in enumerate(game_ids)]
+        requests.append('')
+        sent = time.perf_counter()
+        writer.write('\n'.join(requests).encode())
+        await writer.drain()
+        for _ in range(games):
+            reply = json.loads(await reader.readline())
+            if 'error' in reply:
+                raise ValueError(reply['error'])
+            latencies.append(time.perf_counter() - sent)
+    writer.close()
+
+
+async def run_load(address='127.0.0.1', port=8765, connections=20, games=50, turns=100, seed=0):
+    """
+    Drive a running server from connections connections with games games each, every game playing turns turns,
+    and return a dict of the turns played, turns per second and the p50, p99 and max turn latency in ms.
+    """
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*[_drive_connection(address, port, games, turns, '%s-%d' % (seed, index), latencies)
+                           for index in range(connections)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'turns': len(latencies),
+        'seconds': elapsed,
+        'turns_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': 1000 * latencies[len(latencies) // 2] if latencies else None,
+        'p99_ms': 1000 * latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] if latencies else None,
+        'max_ms': 1000 * latencies[-1] if latencies else None,
+    }
+
+
+async def _serve_forever(args):
+    """Run the server of the serve command until interrupted."""
+    host = GameHost(args.idle)
+    server, sweeper = await start_server(host, args.address, args.port, args.unix, args.sweep)
+    async with server:
+        await server.serve_forever()
+    sweeper.cancel()
+
+
+async def _load(args):
+    """Run the load command, against an in-process server if --local, and return the results."""
+    if not args.local:
+        return await run_load(args.address, args.port, args.connections, args.games, args.turns, args.seed)
+    host = GameHost(args.idle)
+    server, sweeper = await start_server(host, '127.0.0.1', 0, sweep_seconds=args.sweep)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        results = await run_load('127.0.0.1', port, args.connections, args.games, args.turns, args.seed)
+    finally:
+        sweeper.cancel()
+        server.close()
+        await server.wait_closed()
+    results['host'] = host.get_stats()
+    return results
+
+
+def main():
+    """Serve games or generate load from the command line."""
+    parser = argparse.ArgumentParser(description='Host Ludo games over a socket, or measure a host under load.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='serve newline-delimited JSON requests')
+    serve.add_argument('--unix', default=None, help='Unix socket path to listen on instead of TCP')
+    load = commands.add_parser('load', help='drive a server and report turns/sec and latency')
+    load.add_argument('--local', action='store_true', help='start a server in this process to drive')
+    load.add_argument('--connections', type=int, default=20, help='client connections')
+    load.add_argument('--games', type=int, default=50, help='games per connection')
+    load.add_argument('--turns', type=int, default=100, help='turns per game')
+    load.add_argument('--seed', type=int, default=0, help='seed of the players and rolls')
+    for command in (serve, load):
+        command.add_argument('--address', default='127.0.0.1', help='address to listen on or connect to')
+        command.add_argument('--port', type=int, default=8765, help='TCP port')
+        command.add_argument('--idle', type=float, default=60.0, help='seconds before an unused game is evicted')
+        command.add_argument('--sweep', type=float, default=5.0, help='seconds between idle game sweeps')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(_serve_forever(args))
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(json.dumps(asyncio.run(_load(args))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,439 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Solve win probabilities and expected game length of Ludo positions exactly over the game's Markov chain
+
+import argparse
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from LudoGame import advance_turn, pack_steps, unpack_steps, _DECISIONS, _PACK_SHIFT, _POSITIONS, _STEP_TO_BOARD_SQUARE
+
+# a solver state is one integer: the packed game (52 bits), the index of the position to roll next (2 bits) and a
+# bit set when that roll is the bonus roll earned by a 6
+_PACKED_MASK = (1 << 52) - 1
+_TURN_SHIFT = 52
+_BONUS_BIT = 1 << 54
+
+# solved values of a state: the win probability of A, B, C and D, then the expected number of rolls left
+_VALUES = 5
+_EXPECTED = 4
+
+# file of solved states: a header, then one little-endian record of (state, 5 values) per state, appended to
+_CACHE_HEADER = b'LUDOMC01'
+_CACHE_RECORD = struct.Struct('<Q5d')
+
+# most states of a component solved as a dense linear system with NumPy, larger ones are iterated on sparse links
+_DENSE_STATES = 2000
+
+
+def estimate_states(packed):
+    """
+    Return an upper bound of the number of states reachable from a game packed by pack_steps, without enumerating
+    them: the product of the (steps p, steps q) pairs each player can reach (see _reachable_pairs), times the
+    positions that can roll next and whether it is a bonus roll. A token can only be kicked if an opponent's token
+    can land on a board square it can be on, and a token that can be sent home can be on any square after that.
+    """
+    steps = unpack_steps(packed)
+    tokens = [(pos, token_steps) for pos, (steps_p, steps_q) in steps.items() for token_steps in (steps_p, steps_q)]
+    kickable = [False] * len(tokens)
+    changed = True
+    while changed:
+        # the board squares each token can be on, then the tokens an opponent's token could land on
+        squares = []
+        for (pos, token_steps), anywhere in zip(tokens, kickable):
+            first = 1 if anywhere or token_steps == -1 else token_steps
+            squares.append({_STEP_TO_BOARD_SQUARE[pos][step + 1] for step in range(first, 51)})
+        changed = False
+        for index, (pos, _) in enumerate(tokens):
+            if not kickable[index] and any(other != pos and squares[index] & squares[other_index]
+                                           for other_index, (other, _) in enumerate(tokens)):
+                kickable[index] = True
+                changed = True
+
+    count = len(steps) * 2
+    for index, (steps_p, steps_q) in enumerate(steps.values()):
+        count *= _reachable_pairs(steps_p, steps_q, kickable[2 * index], kickable[2 * index + 1])
+    return count
+
+
+def _reachable_pairs(steps_p, steps_q, kickable_p, kickable_q):
+    """
+    Return the number of (steps p, steps q) pairs a player's tokens can reach from steps_p and steps_q by the
+    decision table, short of both at 'E'. If a token is kickable it can be sent home from any board square, and
+    the player can also make the moves of the kick rule, since an opponent may be where a token lands.
+    """
+    start = (steps_p + 1) * 59 + steps_q + 1
+    seen = {start}
+    pending = [start]
+    while pending:
+        pair = pending.pop()
+        stored_p, stored_q = divmod(pair, 59)
+        next_pairs = []
+        for roll in range(1, 7):
+            decision = _DECISIONS[pair * 7 + roll]
+            next_pairs.append((decision & 63) * 59 + (decision >> 6 & 63))
+            if (kickable_p or kickable_q) and decision >> 16 & 15:
+                if decision >> 20 & 1:
+                    next_pairs.append((stored_p + roll) * 59 + (stored_q + roll if stored_q == stored_p else stored_q))
+                if decision >> 21 & 1:
+                    next_pairs.append(stored_p * 59 + stored_q + roll)
+        if kickable_p and 2 <= stored_p <= 51:
+            next_pairs.append(stored_q)
+        if kickable_q and 2 <= stored_q <= 51:
+            next_pairs.append(stored_p * 59)
+        for next_pair in next_pairs:
+            if next_pair not in seen and next_pair != 58 * 59 + 58:
+                seen.add(next_pair)
+                pending.append(next_pair)
+    return len(seen)
+
+
+class MarkovSolver:
+    """
+    Represents an exact solver of Ludo positions. The game is a Markov chain over the positions of all tokens and
+    whose roll is next: players roll a fair die in order, tokens move by the priority rule of LudoGame, a 6 earns
+    one bonus roll (a 6 on the bonus roll does not earn another), and the chain is absorbed when the first player
+    finishes. From a position the solver enumerates every reachable state, splits them into strongly connected
+    components, and solves the components from the end of the game back, so each answer is the absorption
+    probability (or expected number of rolls) of the chain and not an estimate from sampled games.
+
+    Solved states are remembered for the life of the solver, so later positions stop enumerating where they reach a
+    state already solved. If cache_path is given the solved states are also appended to that file and loaded back
+    by the next solver using it.
+    """
+
+    def __init__(self, cache_path=None, max_states=500000, tolerance=1e-15):
+        """
+        Initialize the solver. At most max_states new states are enumerated for one position, and components with
+        cycles are iterated until no value changes by more than tolerance (when they are not solved directly).
+        """
+        self._cache_path = cache_path
+        self._max_states = max_states
+        self._tolerance = tolerance
+        self._values = {}           # solved state -> tuple of its _VALUES values
+        self._loaded = 0            # states loaded from the cache file
+        self._enumerated = 0        # states enumerated and solved by this solver
+        if cache_path is not None and os.path.exists(cache_path):
+            self._load()
+
+    def solve(self, game, turn_pos=None, bonus_roll=False):
+        """
+        Solve the current position of a LudoGame with turn_pos to roll next (the first player of the game if None),
+        and bonus_roll True if that roll is a bonus roll. Return a dict of the win probability of each player and
+        the expected number of rolls until the first player finishes.
+        """
+        return self.solve_packed(game.get_packed_state(), turn_pos, bonus_roll)
+
+    def solve_packed(self, packed, turn_pos=None, bonus_roll=False):
+        """Solve a game packed by pack_steps (or LudoGame.get_packed_state), like solve."""
+        steps = unpack_steps(packed)
+        if turn_pos is None:
+            turn_pos = next(iter(steps), None)
+        if turn_pos not in steps:
+            raise ValueError('Player not found!')
+        if any(steps_p == 57 and steps_q == 57 for steps_p, steps_q in steps.values()):
+            raise ValueError('The game is already won!')
+
+        state = packed | _POSITIONS.index(turn_pos) << _TURN_SHIFT | (_BONUS_BIT if bonus_roll else 0)
+        if state not in self._values:
+            # fail before enumerating for minutes, only while nothing is solved: the bound counts every reachable
+            # state, and states already solved (or loaded from the cache file) are not enumerated again, so then
+            # only _solve_from counts the new states against max_states
+            if not self._values:
+                estimate = estimate_states(packed)
+                if estimate > self._max_states:
+                    raise ValueError('Up to %d states are reachable from this position, more than %d!'
+                                     % (estimate, self._max_states))
+            new_states = self._solve_from(state)
+            if self._cache_path is not None:
+                self._save(new_states)
+        values = self._values[state]
+        return {
+            'win_probabilities': {pos: values[_POSITIONS.index(pos)] for pos in steps},
+            'expected_turns': values[_EXPECTED],
+        }
+
+    def get_win_probabilities(self, game, turn_pos=None, bonus_roll=False):
+        """Return a dict of the probability each player of the game finishes first."""
+        return self.solve(game, turn_pos, bonus_roll)['win_probabilities']
+
+    def get_expected_turns(self, game, turn_pos=None, bonus_roll=False):
+        """Return the expected number of rolls until the first player of the game has both tokens at 'E'."""
+        return self.solve(game, turn_pos, bonus_roll)['expected_turns']
+
+    def get_stats(self):
+        """Return a dict of the number of states solved, loaded from the cache file and enumerated by this solver."""
+        return {'solved': len(self._values), 'loaded': self._loaded, 'enumerated': self._enumerated}
+
+    def _next_states(self, state):
+        """
+        Return the list of the states after each roll 1 to 6 from state. A roll that makes the player finish
+        returns -1 - the index of the winning position instead of a state. The moves come from the decision table
+        of LudoGame.table_priority, read and applied on the packed integer: the opponents are only looked at for
+        the entries marked kick-sensitive, where a token landing on an opponent moves (with the other token if
+        they are together) and sends every opponent token on that square home, like LudoGame.kick.
+        """
+        packed = state & _PACKED_MASK
+        turn = state >> _TURN_SHIFT & 3
+        bonus = state & _BONUS_BIT
+        pos = _POSITIONS[turn]
+        playing = [other for index, other in enumerate(_POSITIONS) if packed >> index & 1]
+        shift = _PACK_SHIFT[pos]
+        stored_p = packed >> shift & 63     # steps + 1 of each token, which also indexes the tables of LudoGame
+        stored_q = packed >> shift + 6 & 63
+        others = packed & ~(4095 << shift)
+        base = (stored_p * 59 + stored_q) * 7
+        board_squares = _STEP_TO_BOARD_SQUARE[pos]
+        opponents = None    # board square -> shifts of the opponent tokens on it, built for the first kick probe
+
+        next_states = []
+        for roll in range(1, 7):
+            decision = _DECISIONS[base + roll]
+            new_p = decision & 63
+            new_q = decision >> 6 & 63
+            if decision >> 16 & 15:
+                if opponents is None:
+                    opponents = self._opponent_squares(packed, pos)
+                kicked = None
+                if decision >> 20 & 1:
+                    kicked = opponents.get(board_squares[stored_p + roll])
+                    if kicked:
+                        new_p, new_q = stored_p + roll, stored_q + roll if stored_q == stored_p else stored_q
+                if not kicked and decision >> 21 & 1:
+                    kicked = opponents.get(board_squares[stored_q + roll])
+                    if kicked:
+                        new_p, new_q = stored_p, stored_q + roll
+                if kicked:
+                    new_others = others
+                    for token_shift in kicked:
+                        new_others &= ~(63 << token_shift)
+                    next_turn, next_bonus = advance_turn(_POSITIONS, turn, roll, bonus, playing)
+                    next_states.append(new_others | new_p << shift | new_q << shift + 6 | next_turn << _TURN_SHIFT
+                                       | (_BONUS_BIT if next_bonus else 0))
+                    continue
+            if new_p == 58 and new_q == 58:
+                next_states.append(-1 - turn)
+                continue
+            next_turn, next_bonus = advance_turn(_POSITIONS, turn, roll, bonus, playing)
+            next_states.append(others | new_p << shift | new_q << shift + 6 | next_turn << _TURN_SHIFT
+                               | (_BONUS_BIT if next_bonus else 0))
+        return next_states
+
+    @staticmethod
+    def _opponent_squares(packed, pos):
+        """Return a dict of board square -> list of the packed shifts of the opponent tokens of pos on it."""
+        opponents = {}
+        for index, other in enumerate(_POSITIONS):
+            if other == pos or not packed >> index & 1:
+                continue
+            for token_shift in (_PACK_SHIFT[other], _PACK_SHIFT[other] + 6):
+                square = _STEP_TO_BOARD_SQUARE[other][packed >> token_shift & 63]
+                if square is not None:
+                    opponents.setdefault(square, []).append(token_shift)
+        return opponents
+
+    def _solve_from(self, start):
+        """
+        Enumerate the unsolved states reachable from start and solve them, one strongly connected component at a
+        time (Tarjan's algorithm, iterative so long games do not hit the recursion limit). A component is only
+        finished once every component it leads to is, so its values only wait on states in the same component.
+        Return the list of states solved.
+        """
+        values = self._values
+        index = {}
+        low = {}
+        next_states = {}
+        stack = []
+        on_stack = set()
+        solved = []
+
+        work = [(start, 0)]
+        while work:
+            state, roll = work.pop()
+            if roll == 0:
+                index[state] = low[state] = len(index)
+                if len(index) > self._max_states:
+                    raise ValueError('More than %d states are reachable from this position!' % self._max_states)
+                next_states[state] = self._next_states(state)
+                stack.append(state)
+                on_stack.add(state)
+
+            # visit the next states not solved yet, continuing from roll after coming back from one
+            descended = False
+            while roll < 6:
+                next_state = next_states[state][roll]
+                roll += 1
+                if next_state < 0 or next_state in values:
+                    continue
+                if next_state not in index:
+                    work.append((state, roll))
+                    work.append((next_state, 0))
+                    descended = True
+                    break
+                if next_state in on_stack:
+                    low[state] = min(low[state], index[next_state])
+            if descended:
+                continue
+
+            # state is the root of a component: pop and solve it
+            if low[state] == index[state]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == state:
+                        break
+                self._solve_component(component, next_states)
+                solved.extend(component)
+                for member in component:
+                    del next_states[member]
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[state])
+
+        self._enumerated += len(solved)
+        return solved
+
+    def _solve_component(self, component, next_states):
+        """
+        Solve the states of one strongly connected component given the values of every state it leads out to.
+        Each state's values are the average over the 6 rolls of the next state's values (plus one roll for the
+        expected rolls left), which is a linear system over the component. A single state is solved directly, a
+        larger component with NumPy (see _solve_linear), or by Gauss-Seidel iteration without it, which converges
+        because every state of a component can reach the end of the game.
+        """
+        values = self._values
+        members = set(component)
+        constants = {}      # state -> the part of its values from rolls leaving the component, times 6
+        links = {}          # state -> the other states of the component its rolls lead to, once per roll
+        loops = {}          # state -> the number of rolls that leave the state where it is
+        for state in component:
+            constant = [0.0] * _VALUES
+            constant[_EXPECTED] = 6.0
+            links[state] = []
+            loops[state] = 0
+            for next_state in next_states[state]:
+                if next_state < 0:
+                    constant[-1 - next_state] += 1.0
+                elif next_state == state:
+                    loops[state] += 1
+                elif next_state in members:
+                    links[state].append(next_state)
+                else:
+                    next_values = values[next_state]
+                    for value in range(_VALUES):
+                        constant[value] += next_values[value]
+            constants[state] = constant
+
+        if len(component) == 1:
+            state = component[0]
+            values[state] = tuple(constant / (6 - loops[state]) for constant in constants[state])
+            return
+        if np is not None:
+            self._solve_linear(component, constants, links, loops)
+            return
+
+        current = {state: [0.0] * _VALUES for state in component}
+        for _ in range(1000000):
+            change = 0.0
+            for state in component:
+                new = list(constants[state])
+                for next_state in links[state]:
+                    next_values = current[next_state]
+                    for value in range(_VALUES):
+                        new[value] += next_values[value]
+                old = current[state]
+                for value in range(_VALUES):
+                    new[value] /= 6 - loops[state]
+                    change = max(change, abs(new[value] - old[value]) / max(1.0, new[value]))
+                current[state] = new
+            if change <= self._tolerance:
+                break
+        else:
+            raise ValueError('The values of %d states did not converge!' % len(component))
+        for state in component:
+            values[state] = tuple(current[state])
+
+    def _solve_linear(self, component, constants, links, loops):
+        """
+        Solve a component with NumPy: (6 - loops) * values - the values of the linked states = constants, for every
+        state. Components of up to _DENSE_STATES states are solved as a dense system, larger ones by Jacobi
+        iteration over arrays of the links until no value changes by more than tolerance.
+        """
+        size = len(component)
+        index = {state: position for position, state in enumerate(component)}
+        rows = np.array([index[state] for state in component for _ in links[state]], dtype=np.intp)
+        columns = np.array([index[next_state] for state in component for next_state in links[state]], dtype=np.intp)
+        diagonal = np.array([6.0 - loops[state] for state in component])
+        constant = np.array([constants[state] for state in component])
+
+        if size <= _DENSE_STATES:
+            matrix = np.diag(diagonal)
+            np.add.at(matrix, (rows, columns), -1.0)
+            solution = np.linalg.solve(matrix, constant)
+        else:
+            solution = np.zeros_like(constant)
+            linked = np.empty_like(constant)
+            for _ in range(1000000):
+                for value in range(_VALUES):
+                    linked[:, value] = np.bincount(rows, weights=solution[columns, value], minlength=size)
+                new = (constant + linked) / diagonal[:, None]
+                change = np.max(np.abs(new - solution) / np.maximum(1.0, new))
+                solution = new
+                if change <= self._tolerance:
+                    break
+            else:
+                raise ValueError('The values of %d states did not converge!' % size)
+        for position, state in enumerate(component):
+            self._values[state] = tuple(solution[position].tolist())
+
+    def _load(self):
+        """Load the solved states of the cache file."""
+        with open(self._cache_path, 'rb') as cache_file:
+            data = cache_file.read()
+        if data[:len(_CACHE_HEADER)] != _CACHE_HEADER:
+            raise ValueError('%s is not a solver cache!' % self._cache_path)
+        for record in _CACHE_RECORD.iter_unpack(data[len(_CACHE_HEADER):]):
+            self._values[record[0]] = record[1:]
+        self._loaded = len(self._values)
+
+    def _save(self, states):
+        """Append the solved values of states to the cache file, creating it if needed."""
+        with open(self._cache_path, 'ab') as cache_file:
+            if cache_file.tell() == 0:
+                cache_file.write(_CACHE_HEADER)
+            cache_file.write(b''.join(_CACHE_RECORD.pack(state, *self._values[state]) for state in states))
+
+
+def main():
+    """Solve one position from the command line and print the results."""
+    parser = argparse.ArgumentParser(description='Solve the exact win probabilities of a Ludo position.')
+    parser.add_argument('tokens', nargs='+',
+                        help="total steps of each player's tokens, for example 'A=50,52' 'C=-1,0' (-1 is 'H')")
+    parser.add_argument('--turn', default=None, help='position to roll next (default: the first player)')
+    parser.add_argument('--bonus', action='store_true', help='the next roll is a bonus roll')
+    parser.add_argument('--cache', default=None, help='file of solved states to load and add to')
+    parser.add_argument('--max-states', type=int, default=500000, help='states to enumerate before giving up')
+    args = parser.parse_args()
+
+    steps = {}
+    for token in args.tokens:
+        pos, counts = token.split('=')
+        steps_p, steps_q = counts.split(',')
+        steps[pos.upper()] = (int(steps_p), int(steps_q))
+    solver = MarkovSolver(args.cache, args.max_states)
+    result = solver.solve_packed(pack_steps(steps), args.turn and args.turn.upper(), args.bonus)
+    for pos, probability in result['win_probabilities'].items():
+        print('%s  win probability %.10f' % (pos, probability))
+    print('expected rolls: %.6f' % result['expected_turns'])
+    print('states:', solver.get_stats())
+
+
+if __name__ == '__main__':
+    main()
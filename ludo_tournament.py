@@ -0,0 +1,185 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Run a Ludo tournament of random games on a pool of worker processes
+
+import argparse
+import multiprocessing
+import random
+
+from LudoGame import LudoGame, advance_turn
+
+
+class TournamentStats:
+    """
+    Represents the merged results of a number of games: wins of each position, a histogram of the turn the winner
+    finished on, tokens each position kicked home, and the sum of final token step counts to average over.
+    """
+
+    def __init__(self, players, bucket_size=10):
+        """Initialize empty results for the players list, finish turns are counted in buckets of bucket_size."""
+        self._players = list(players)
+        self._bucket_size = bucket_size
+        self._games = 0
+        self._draws = 0                                         # games where nobody finished within the turn limit
+        self._wins = {pos: 0 for pos in self._players}
+        self._kicks = {pos: 0 for pos in self._players}         # opponent tokens sent home by each position
+        self._step_sums = {pos: 0 for pos in self._players}     # final steps of both tokens, summed over games
+        self._finish_turns = {}                                 # bucket start -> number of games won in the bucket
+
+    def add_game(self, winner, finish_turn, kicks, steps):
+        """
+        Add the result of one game: the winning position (None for a draw) and the turn it finished on, a dict of
+        kicks per position and a dict of the final (p, q) step counts per position.
+        """
+        self._games += 1
+        if winner is None:
+            self._draws += 1
+        else:
+            self._wins[winner] += 1
+            bucket = finish_turn // self._bucket_size * self._bucket_size
+            self._finish_turns[bucket] = self._finish_turns.get(bucket, 0) + 1
+        for pos in self._players:
+            self._kicks[pos] += kicks[pos]
+            self._step_sums[pos] += steps[pos][0] + steps[pos][1]
+
+    def merge(self, other):
+        """Add the results of another TournamentStats for the same players to these results."""
+        self._games += other._games
+        self._draws += other._draws
+        for pos in self._players:
+            self._wins[pos] += other._wins[pos]
+            self._kicks[pos] += other._kicks[pos]
+            self._step_sums[pos] += other._step_sums[pos]
+        for bucket, count in other._finish_turns.items():
+            self._finish_turns[bucket] = self._finish_turns.get(bucket, 0) + count
+
+    def get_games(self):
+        """Return the number of games played."""
+        return self._games
+
+    def get_draws(self):
+        """Return the number of games nobody finished within the turn limit."""
+        return self._draws
+
+    def get_win_rates(self):
+        """Return a dict of the share of games each position won."""
+        return {pos: self._wins[pos] / self._games if self._games else 0.0 for pos in self._players}
+
+    def get_finish_turns(self):
+        """Return the finish turn histogram as a sorted list of (bucket start, games) tuples."""
+        return sorted(self._finish_turns.items())
+
+    def get_kicks(self):
+        """Return a dict of the total number of opponent tokens each position kicked home."""
+        return dict(self._kicks)
+
+    def get_average_steps(self):
+        """Return a dict of the average final step count of a token of each position."""
+        return {pos: self._step_sums[pos] / (2 * self._games) if self._games else 0.0 for pos in self._players}
+
+    def to_dict(self):
+        """Return the results as a dict of plain values, for printing or saving as JSON."""
+        return {
+            'games': self._games,
+            'draws': self._draws,
+            'win_rates': self.get_win_rates(),
+            'finish_turns': self.get_finish_turns(),
+            'kicks': self.get_kicks(),
+            'average_steps': self.get_average_steps(),
+        }
+
+
+def play_random_game(players, rng, max_turns=2000):
+    """
+    Play one game with dice rolls from rng. Players roll in order, a 6 earns one bonus roll, and finished players
+    are skipped. The game ends once only one player is left playing (or the only player finishes), or after
+    max_turns rolls. Return (winner, finish turn, kicks per position, final (p, q) steps per position).
+    """
+    game = LudoGame()
+    game.start_game(players)
+    order = list(players)
+    everyone = [game.get_player_by_position(pos) for pos in order]
+    playing = dict(zip(order, everyone))
+    kicks = {pos: 0 for pos in order}
+    winner = None
+    finish_turn = None
+
+    turn = 0
+    current = 0
+    bonus_roll = False
+    while turn < max_turns and len(playing) > (1 if len(order) > 1 else 0):
+        pos = order[current]
+        player = playing[pos]
+        roll = rng.randint(1, 6)
+        turn += 1
+
+        # count the opponents' tokens this turn sends home
+        for position, _, _, new_space in game.apply_turn(pos, roll):
+            if position != pos and new_space == 'H':
+                kicks[pos] += 1
+
+        # a finished player stops playing, so it gets no bonus roll
+        if player.get_completed() is True:
+            if winner is None:
+                winner = pos
+                finish_turn = turn
+            del playing[pos]
+        current, bonus_roll = advance_turn(order, current, roll, bonus_roll, playing)
+
+    steps = {pos: (player.get_token_p_step_count(), player.get_token_q_step_count())
+             for pos, player in zip(order, everyone)}
+    return winner, finish_turn, kicks, steps
+
+
+def _play_shard(task):
+    """Play the games of one shard in a worker process and return their TournamentStats."""
+    players, seed, first_game, games, max_turns, bucket_size = task
+    stats = TournamentStats(players, bucket_size)
+    for index in range(first_game, first_game + games):
+        # every game has its own random generator, so results do not depend on how games are split into shards
+        rng = random.Random('%s-%d' % (seed, index))
+        stats.add_game(*play_random_game(players, rng, max_turns))
+    return stats
+
+
+def run_tournament(players, games, seed=0, workers=None, shard_size=500, max_turns=2000, bucket_size=10):
+    """
+    Play games random games between the players list on a pool of workers processes (one per CPU by default)
+    and return the merged TournamentStats. Game i always plays with the dice of (seed, i), so the same seed gives
+    the same results whatever the number of workers.
+    """
+    players = [pos for pos in 'ABCD' if pos in players]
+    tasks = [(players, seed, first, min(shard_size, games - first), max_turns, bucket_size)
+             for first in range(0, games, shard_size)]
+    stats = TournamentStats(players, bucket_size)
+    if workers == 1:
+        for task in tasks:
+            stats.merge(_play_shard(task))
+        return stats
+    with multiprocessing.Pool(workers) as pool:
+        for shard_stats in pool.imap(_play_shard, tasks):
+            stats.merge(shard_stats)
+    return stats
+
+
+def main():
+    """Run a tournament from the command line and print the results."""
+    parser = argparse.ArgumentParser(description='Play random Ludo games and report win rates and statistics.')
+    parser.add_argument('players', help="positions playing, for example 'AC' or 'ABCD'")
+    parser.add_argument('--games', type=int, default=10000, help='number of games to play')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the dice rolls')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--max-turns', type=int, default=2000, help='rolls before a game is called a draw')
+    args = parser.parse_args()
+
+    stats = run_tournament(list(args.players.upper()), args.games, args.seed, args.workers,
+                           max_turns=args.max_turns)
+    print('games:', stats.get_games(), 'draws:', stats.get_draws())
+    for pos, rate in stats.get_win_rates().items():
+        print('%s  win rate %.4f  kicks %d  average steps %.2f'
+              % (pos, rate, stats.get_kicks()[pos], stats.get_average_steps()[pos]))
+    print('finish turns:', stats.get_finish_turns())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Generate turns of Ludo games biased towards situations like kicks, shared by the benchmarks and fuzzer
+
+from LudoGame import LudoGame, unpack_steps
+
+
+def make_biased_turns(players, length, rng, situation, bias=0.8, score=None):
+    """
+    Return length turns of a game between the players list, trying every possible turn by the priority rule
+    before each one. With probability bias the turn is picked with rng among the turns where situation(pos, roll,
+    steps before, steps after) is True, if there are any. Otherwise, if score(pos, roll, before, after) is given,
+    the turn scoring highest is picked with probability bias, to steer the game towards the situation, and else
+    a random turn. The steps are dicts of position -> (steps p, steps q) like unpack_steps returns.
+    """
+    game = LudoGame()
+    game.start_game(players)
+    turns = []
+    for _ in range(length):
+        packed = game.get_packed_state()
+        before = unpack_steps(packed)
+        wanted = []
+        scored = []
+        for pos in players:
+            for roll in range(1, 7):
+                game.priority(game.get_player_by_position(pos), roll)
+                after = unpack_steps(game.get_packed_state())
+                if situation(pos, roll, before, after):
+                    wanted.append((pos, roll))
+                if score is not None:
+                    scored.append((score(pos, roll, before, after), pos, roll))
+                game.set_packed_state(packed)
+        if wanted and rng.random() < bias:
+            turn = rng.choice(wanted)
+        elif score is not None and rng.random() < bias:
+            turn = max(scored)[1:]
+        else:
+            turn = (rng.choice(players), rng.randint(1, 6))
+        game.priority(game.get_player_by_position(turn[0]), turn[1])
+        turns.append(turn)
+    return turns
+
+
+def kicked(pos, roll, before, after):
+    """Return True if the turn sent an opponent's token home."""
+    return any(after[other].count(-1) > before[other].count(-1) for other in before if other != pos)
+
+
+def stacked(pos, roll, before, after):
+    """Return True if the mover's tokens are stacked on the board after the turn."""
+    steps_p, steps_q = after[pos]
+    return steps_p == steps_q and 0 < steps_p < 57
+
+
+def bounced(pos, roll, before, after):
+    """Return True if one of the mover's tokens went past 'E' and bounced back."""
+    return any(old + roll > 57 and new == 114 - old - roll for old, new in zip(before[pos], after[pos]))
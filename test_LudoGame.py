@@ -0,0 +1,232 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Scenario tests of the kick rules, the decision table and the turn by turn APIs of LudoGame
+
+import random
+import unittest
+
+import LudoGame as ludo
+from LudoGame import LudoGame, advance_turn, pack_steps
+
+
+def _play(steps, player_pos, roll):
+    """
+    Play one roll by the priority rule from a game with the tokens at steps, a dict of position -> (steps p,
+    steps q), and return the rule that decided it and the token spaces after it. The same roll is played through
+    play_turn on a second game, which must end the same way.
+    """
+    game = LudoGame()
+    game.set_packed_state(pack_steps(steps))
+    rule = game.priority(game.get_player_by_position(player_pos), roll)
+    other = LudoGame()
+    other.set_packed_state(pack_steps(steps))
+    other.play_turn(other.get_player_by_position(player_pos), roll)
+    if other.get_spaces() != game.get_spaces():
+        raise AssertionError('play_turn ended at %s, priority at %s' % (other.get_spaces(), game.get_spaces()))
+    return rule, game.get_spaces()
+
+
+class KickEveryOpponentTest(unittest.TestCase):
+    """A kick looks at the tokens of every opponent, not only the first one."""
+
+    def test_kicks_the_second_opponent(self):
+        # A q lands on space 33 where C p is, B (the first opponent) is on space 15
+        rule, spaces = _play({'A': (10, 30), 'B': (1, -1), 'C': (5, -1)}, 'A', 3)
+        self.assertEqual(rule, 'kick')
+        self.assertEqual(spaces, ['10', '33', '15', 'H', 'H', 'H'])
+
+    def test_kicks_both_tokens_of_a_stack(self):
+        rule, spaces = _play({'A': (10, 30), 'C': (5, 5)}, 'A', 3)
+        self.assertEqual(rule, 'kick')
+        self.assertEqual(spaces, ['10', '33', 'H', 'H'])
+
+    def test_kicks_with_the_third_opponent(self):
+        # A p lands on space 13, D q is there (D starts on 43, so its step 27 is space 13)
+        rule, spaces = _play({'A': (10, 30), 'B': (1, -1), 'C': (1, -1), 'D': (-1, 27)}, 'A', 3)
+        self.assertEqual(rule, 'kick')
+        self.assertEqual(spaces, ['13', '30', '15', 'H', '29', 'H', 'H', 'H'])
+
+
+class HomeTokensDoNotKickTest(unittest.TestCase):
+    """A token in Home only leaves it on a 6, it never lands on the board by kicking."""
+
+    def test_home_token_does_not_kick(self):
+        # space 2 is where A p would be after 3 steps from 'H', D p is there (D step 16)
+        rule, spaces = _play({'A': (-1, 10), 'D': (16, -1)}, 'A', 3)
+        self.assertEqual(rule, 'only_token')
+        self.assertEqual(spaces, ['H', '13', '2', 'H'])
+
+    def test_both_home_tokens_do_not_kick(self):
+        rule, spaces = _play({'A': (-1, -1), 'D': (16, 16)}, 'A', 3)
+        self.assertEqual(rule, 'no_move')
+        self.assertEqual(spaces, ['H', 'H', '2', '2'])
+
+    def test_leaving_home_does_not_kick(self):
+        rule, spaces = _play({'A': (-1, 10), 'D': (16, -1)}, 'A', 6)
+        self.assertEqual(rule, 'leave_home')
+        self.assertEqual(spaces, ['R', '10', '2', 'H'])
+
+
+class ReadyAndEndAreNotSharedTest(unittest.TestCase):
+    """'R' and 'E' belong to each player, tokens there are never kicked even though the names match."""
+
+    def test_leaving_home_next_to_a_ready_token(self):
+        rule, spaces = _play({'A': (-1, 10), 'B': (0, -1)}, 'A', 6)
+        self.assertEqual(rule, 'leave_home')
+        self.assertEqual(spaces, ['R', '10', 'R', 'H'])
+
+    def test_home_token_does_not_land_on_ready(self):
+        # one step from 'H' is 'R', which is not a square B's token at 'R' can be kicked from
+        rule, spaces = _play({'A': (-1, 10), 'B': (0, -1)}, 'A', 1)
+        self.assertEqual(rule, 'only_token')
+        self.assertEqual(spaces, ['H', '11', 'R', 'H'])
+
+    def test_moving_from_ready_with_an_opponent_ready(self):
+        rule, spaces = _play({'A': (0, -1), 'B': (0, -1)}, 'A', 2)
+        self.assertEqual(rule, 'only_token')
+        self.assertEqual(spaces, ['2', 'H', 'R', 'H'])
+
+    def test_finishing_next_to_a_finished_token(self):
+        rule, spaces = _play({'A': (54, 10), 'C': (57, 20)}, 'A', 3)
+        self.assertEqual(rule, 'exact_finish')
+        self.assertEqual(spaces, ['E', '10', 'E', '48'])
+
+    def test_ready_token_lands_on_an_opponent(self):
+        # the first move from 'R' lands on space 2, a board square, where D p is
+        rule, spaces = _play({'A': (0, 10), 'D': (16, -1)}, 'A', 2)
+        self.assertEqual(rule, 'kick')
+        self.assertEqual(spaces, ['2', '10', 'H', 'H'])
+
+
+class DecisionTableTest(unittest.TestCase):
+    """table_priority plays every turn like priority, the bundled table included."""
+
+    def test_bundled_table_is_up_to_date(self):
+        self.assertEqual(ludo._DECISIONS, ludo._build_decision_table(),
+                         'ludo_decisions.bin is out of date, run LudoGame.write_decision_table()')
+
+    def _assert_same_turn(self, steps, player_pos, roll):
+        """Assert that priority and table_priority end the turn the same way with the same rule."""
+        games = []
+        rules = []
+        for method in ('priority', 'table_priority'):
+            game = LudoGame()
+            game.set_packed_state(pack_steps(steps))
+            rules.append(getattr(game, method)(game.get_player_by_position(player_pos), roll))
+            games.append(game.get_spaces())
+        self.assertEqual(rules[0], rules[1], (steps, player_pos, roll))
+        self.assertEqual(games[0], games[1], (steps, player_pos, roll))
+
+    def test_rolls_out_of_range_go_through_priority(self):
+        for roll in (0, 7, 8, -1):
+            self._assert_same_turn({'A': (4, 2), 'C': (20, -1)}, 'A', roll)
+
+    def test_steps_out_of_range_go_through_priority(self):
+        for roll in range(1, 7):
+            self._assert_same_turn({'A': (58, 2)}, 'A', roll)
+            self._assert_same_turn({'A': (3, 60)}, 'A', roll)
+
+    def test_random_turns(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            players = sorted(rng.sample('ABCD', rng.randint(2, 4)))
+            steps = {pos: (rng.randint(-1, 57), rng.randint(-1, 57)) for pos in players}
+            self._assert_same_turn(steps, rng.choice(players), rng.randint(1, 6))
+
+
+class AdvanceTurnTest(unittest.TestCase):
+    """Players roll in order, a 6 earns one bonus roll, and players no longer playing are skipped."""
+
+    def test_next_player(self):
+        self.assertEqual(advance_turn('ACD', 0, 3, False), (1, False))
+        self.assertEqual(advance_turn('ACD', 2, 5, False), (0, False))
+
+    def test_six_earns_one_bonus_roll(self):
+        self.assertEqual(advance_turn('AC', 1, 6, False), (1, True))
+        self.assertEqual(advance_turn('AC', 1, 6, True), (0, False))
+
+    def test_skips_players_not_playing(self):
+        self.assertEqual(advance_turn('ABCD', 0, 2, False, 'AD'), (3, False))
+        # a player that just finished gets no bonus roll
+        self.assertEqual(advance_turn('ABCD', 1, 6, False, 'ACD'), (2, False))
+
+
+class ApplyTurnTest(unittest.TestCase):
+    """apply_turn plays one roll and returns the (position, token, old space, new space) of every token moved."""
+
+    def _apply(self, steps, player_pos, roll):
+        """Return the change apply_turn reports for one roll from a game with the tokens at steps."""
+        game = LudoGame()
+        game.set_packed_state(pack_steps(steps))
+        return game.apply_turn(player_pos, roll)
+
+    def test_move_and_leave_home(self):
+        self.assertEqual(self._apply({'A': (-1, -1), 'C': (-1, -1)}, 'A', 3), [])
+        self.assertEqual(self._apply({'A': (-1, -1), 'C': (-1, -1)}, 'A', 6), [('A', 'p', 'H', 'R')])
+        self.assertEqual(self._apply({'A': (54, 50), 'C': (5, -1)}, 'A', 5), [('A', 'q', '50', 'A5')])
+        self.assertEqual(self._apply({'A': (10, 10), 'C': (-1, -1)}, 'A', 2),
+                         [('A', 'p', '10', '12'), ('A', 'q', '10', '12')])
+
+    def test_kicked_tokens_go_to_home(self):
+        self.assertEqual(self._apply({'A': (10, 30), 'C': (5, -1)}, 'A', 3),
+                         [('A', 'q', '30', '33'), ('C', 'p', '33', 'H')])
+        self.assertEqual(self._apply({'A': (10, 30), 'C': (5, 5)}, 'A', 3),
+                         [('A', 'q', '30', '33'), ('C', 'p', '33', 'H'), ('C', 'q', '33', 'H')])
+
+    def test_player_not_found(self):
+        game = LudoGame()
+        game.start_game(['A', 'C'])
+        with self.assertRaises(ValueError):
+            game.apply_turn('B', 6)
+
+    def test_changes_add_up_to_play_game(self):
+        rng = random.Random(1)
+        players = ['A', 'B', 'D']
+        turns = [(rng.choice(players), rng.randint(1, 6)) for _ in range(400)]
+        game = LudoGame()
+        game.start_game(players)
+        spaces = game.get_spaces()
+        for pos, roll in turns:
+            for position, token, old_space, new_space in game.apply_turn(pos, roll):
+                index = 2 * players.index(position) + (token == 'q')
+                self.assertEqual(spaces[index], old_space)
+                spaces[index] = new_space
+            self.assertEqual(spaces, game.get_spaces())
+        self.assertEqual(spaces, LudoGame().play_game(players, turns))
+
+
+class StreamingTest(unittest.TestCase):
+    """play_game reads turns from any iterable, and with stream True yields the spaces after every turn."""
+
+    def setUp(self):
+        rng = random.Random(2)
+        self._players = ['A', 'C', 'D']
+        self._turns = [(rng.choice(self._players), rng.randint(1, 6)) for _ in range(300)]
+
+    def test_iterator_of_turns(self):
+        self.assertEqual(LudoGame().play_game(self._players, iter(self._turns)),
+                         LudoGame().play_game(self._players, self._turns))
+
+    def test_stream_yields_every_turn(self):
+        snapshots = list(LudoGame().play_game(self._players, iter(self._turns), stream=True))
+        self.assertEqual(len(snapshots), len(self._turns))
+        for count in (1, 2, 150, 300):
+            self.assertEqual(snapshots[count - 1], LudoGame().play_game(self._players, self._turns[:count]))
+
+    def test_stream_reads_one_turn_at_a_time(self):
+        read = []
+
+        def turns():
+            for turn in self._turns:
+                read.append(turn)
+                yield turn
+
+        snapshots = LudoGame().play_game(self._players, turns(), stream=True)
+        self.assertEqual(read, [])
+        next(snapshots)
+        next(snapshots)
+        self.assertEqual(len(read), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Tests that every engine registered with the differential fuzzer agrees with LudoGame
+
+import random
+import unittest
+
+from ludo_fuzz import KINDS, generate_case, get_engines, run_fuzz
+
+
+class FuzzTest(unittest.TestCase):
+    """A short fuzzing run finds no case where an engine differs from the reference."""
+
+    def test_engines_agree_with_reference(self):
+        report = run_fuzz(200, workers=1)
+        self.assertGreater(report['turns'], 0)
+        self.assertEqual(sorted(report['engines']), sorted(get_engines()))
+        for name, engine in report['engines'].items():
+            self.assertEqual(engine['failures'], 0, (name, engine))
+
+    def test_cases_follow_seed(self):
+        for kind in KINDS:
+            self.assertEqual(generate_case(random.Random(3), kind, 50), generate_case(random.Random(3), kind, 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Tests of journaling a game's turns and moving it back and forth with undo, redo and seek
+
+import random
+import unittest
+
+from LudoGame import LudoGame, TransitionCache
+from ludo_journal import GameJournal
+
+
+def _journaled_game(players, turns, checkpoint_interval=64, cache=None):
+    """Return the journal of a new game between the players list with turns played through it."""
+    game = LudoGame(cache)
+    game.start_game(players)
+    journal = GameJournal(game, checkpoint_interval)
+    for pos, roll in turns:
+        journal.play_turn(pos, roll)
+    return journal
+
+
+def _spaces_after(players, turns):
+    """Return the token spaces of a fresh game after playing turns, like LudoGame.play_game."""
+    return LudoGame().play_game(players, turns)
+
+
+class GameJournalTest(unittest.TestCase):
+    """Moving a journaled game to a turn leaves it as a fresh game played for that many turns would be."""
+
+    def setUp(self):
+        rng = random.Random(0)
+        self._rng = rng
+        self._players = ['A', 'B', 'C', 'D']
+        self._turns = [(rng.choice(self._players), rng.randint(1, 6)) for _ in range(300)]
+
+    def test_play_turn_like_play_game(self):
+        journal = _journaled_game(self._players, self._turns)
+        self.assertEqual(journal.get_game().get_spaces(), _spaces_after(self._players, self._turns))
+        self.assertEqual(journal.get_turns(), self._turns)
+        self.assertEqual(journal.get_turn(), len(self._turns))
+
+    def test_seek(self):
+        # intervals of one turn, a few turns and more than the game, so every seek path is taken
+        for interval in (1, 7, 512):
+            journal = _journaled_game(self._players, self._turns, interval)
+            for turn in [0, len(self._turns), 1, 150] + [self._rng.randint(0, len(self._turns)) for _ in range(30)]:
+                journal.seek(turn)
+                self.assertEqual(journal.get_turn(), turn)
+                self.assertEqual(journal.get_game().get_spaces(), _spaces_after(self._players, self._turns[:turn]),
+                                 (interval, turn))
+
+    def test_seek_out_of_range(self):
+        journal = _journaled_game(self._players, self._turns[:10])
+        for turn in (-1, 11):
+            with self.assertRaises(ValueError):
+                journal.seek(turn)
+
+    def test_undo_redo_is_identity(self):
+        journal = _journaled_game(self._players, self._turns, 16)
+        game = journal.get_game()
+        for turn in range(len(self._turns), 0, -1):
+            packed = game.get_packed_state()
+            self.assertTrue(journal.undo())
+            self.assertEqual(game.get_spaces(), _spaces_after(self._players, self._turns[:turn - 1]))
+            self.assertTrue(journal.redo())
+            self.assertEqual(game.get_packed_state(), packed)
+            journal.undo()
+        self.assertFalse(journal.undo())
+        while journal.redo():
+            pass
+        self.assertEqual(game.get_spaces(), _spaces_after(self._players, self._turns))
+
+    def test_branch_after_undo(self):
+        journal = _journaled_game(self._players, self._turns, 8)
+        journal.seek(100)
+        for _ in range(3):
+            journal.undo()
+        # long enough to pass the checkpoints of turns 104 and 112, which are made again for the new turns
+        branch = [('B', 6), ('B', 3), ('D', 6), ('A', 5)] + [(self._rng.choice(self._players), self._rng.randint(1, 6))
+                                                             for _ in range(16)]
+        for pos, roll in branch:
+            journal.play_turn(pos, roll)
+        turns = self._turns[:97] + branch
+        # the undone turns are dropped, so there is nothing to redo and the checkpoints follow the new turns
+        self.assertFalse(journal.redo())
+        self.assertEqual(journal.get_turns(), turns)
+        self.assertEqual(journal.get_game().get_spaces(), _spaces_after(self._players, turns))
+        for turn in (0, 50, 96, 98, 106, len(turns), 113):
+            journal.seek(turn)
+            self.assertEqual(journal.get_game().get_spaces(), _spaces_after(self._players, turns[:turn]))
+
+    def test_journal_with_transition_cache(self):
+        cache = TransitionCache(1000)
+        _journaled_game(self._players, self._turns, cache=cache)
+        journal = _journaled_game(self._players, self._turns, 16, cache)
+        for turn in (0, 77, len(self._turns)):
+            journal.seek(turn)
+            self.assertEqual(journal.get_game().get_spaces(), _spaces_after(self._players, self._turns[:turn]))
+
+
+class SerializationTest(unittest.TestCase):
+    """from_bytes(to_bytes()) resumes a journal at the same turn, with the same history."""
+
+    def _round_trip(self, journal):
+        """Return the journal restored from its bytes into a new game."""
+        return GameJournal.from_bytes(journal.to_bytes())
+
+    def test_round_trip(self):
+        rng = random.Random(1)
+        players = ['A', 'C']
+        turns = [(rng.choice(players), rng.randint(1, 6)) for _ in range(200)]
+        journal = _journaled_game(players, turns, 32)
+        journal.seek(123)
+        restored = self._round_trip(journal)
+        self.assertEqual(restored.get_turn(), 123)
+        self.assertEqual(restored.get_turns(), turns)
+        self.assertEqual(restored.get_game().get_packed_state(), journal.get_game().get_packed_state())
+        self.assertEqual(restored.to_bytes(), journal.to_bytes())
+
+        # the restored journal keeps going like the original one
+        restored.seek(len(turns))
+        self.assertEqual(restored.get_game().get_spaces(), _spaces_after(players, turns))
+        restored.seek(5)
+        self.assertEqual(restored.get_game().get_spaces(), _spaces_after(players, turns[:5]))
+        restored.play_turn('C', 6)
+        self.assertEqual(restored.get_game().get_spaces(), _spaces_after(players, turns[:5] + [('C', 6)]))
+
+    def test_round_trip_of_empty_journal(self):
+        restored = self._round_trip(_journaled_game(['B', 'D'], []))
+        self.assertEqual(restored.get_turn_count(), 0)
+        self.assertEqual(restored.get_game().get_spaces(), _spaces_after(['B', 'D'], []))
+
+    def test_not_a_journal(self):
+        with self.assertRaises(ValueError):
+            GameJournal.from_bytes(b'LUDOLOG1' + bytes(40))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Tests of replaying binary turn logs, including truncated and corrupt records
+
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from LudoGame import LudoGame
+from ludo_replay import replay_log, write_binary_log, _GAME_HEADER, _LOG_HEADER
+
+
+def _random_games(count, seed=0):
+    """Return count random games as (players, turns) like the parameters of play_game."""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        players = sorted(rng.sample('ABCD', rng.randint(2, 4)))
+        games.append((players, [(rng.choice(players), rng.randint(1, 6)) for _ in range(rng.randint(0, 80))]))
+    return games
+
+
+class BinaryLogTest(unittest.TestCase):
+    """Binary logs replay like play_game, and a bad record is an error of that game only."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, 'games.bin')
+        self._games = _random_games(40)
+        write_binary_log(self._path, self._games)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _replay(self, workers=1, chunk_size=256):
+        """Replay the log and return the list of JSON records written and the statistics."""
+        output = io.StringIO()
+        stats = replay_log(self._path, output, workers, chunk_size)
+        return [json.loads(line) for line in output.getvalue().splitlines()], stats
+
+    def _truncate(self, size):
+        """Cut the log down to size bytes."""
+        with open(self._path, 'r+b') as log_file:
+            log_file.truncate(size)
+
+    def test_replays_like_play_game(self):
+        records, stats = self._replay()
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual([record['spaces'] for record in records],
+                         [LudoGame().play_game(players, turns) for players, turns in self._games])
+
+    def test_truncated_turns(self):
+        self._truncate(os.path.getsize(self._path) - 1)
+        for workers in (1, 2):
+            records, stats = self._replay(workers)
+            self.assertEqual(len(records), len(self._games))
+            self.assertEqual(stats['errors'], 1)
+            self.assertIn('truncated', records[-1]['error'])
+            self.assertEqual(records[-2]['spaces'], LudoGame().play_game(*self._games[-2]))
+
+    def test_truncated_header(self):
+        last_record = os.path.getsize(self._path) - _GAME_HEADER.size - len(self._games[-1][1])
+        self._truncate(last_record + 2)
+        records, stats = self._replay()
+        self.assertEqual(len(records), len(self._games))
+        self.assertEqual(records[-1]['error'], 'Invalid game at byte %d: the record is truncated' % last_record)
+
+    def test_corrupt_turn_fails_one_game(self):
+        first_turn = len(_LOG_HEADER) + _GAME_HEADER.size
+        self.assertTrue(self._games[0][1])
+        with open(self._path, 'r+b') as log_file:
+            log_file.seek(first_turn)
+            log_file.write(b'\xff')
+        records, stats = self._replay()
+        self.assertEqual(stats['errors'], 1)
+        self.assertIn('byte %d' % len(_LOG_HEADER), records[0]['error'])
+        self.assertEqual(records[1]['spaces'], LudoGame().play_game(*self._games[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
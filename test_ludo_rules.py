@@ -0,0 +1,101 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Tests of the rules configuration and of the generic engine against LudoGame
+
+import random
+import unittest
+
+from LudoGame import LudoGame
+from ludo_rules import RulesConfig, RulesEngine
+from ludo_turns import make_biased_turns, bounced, kicked, stacked
+
+
+class RulesConfigTest(unittest.TestCase):
+    """A configuration that can't be played is rejected when it is made."""
+
+    def test_invalid_configs(self):
+        for options in ({'tokens': 0}, {'tokens': 9}, {'track_length': 0}, {'track_length': 57},
+                        {'home_length': -1}, {'leave_roll': 0}, {'leave_roll': 7}, {'start_spaces': {}},
+                        {'start_spaces': {'A': 1, 'C': 57}}, {'start_spaces': {'A': 0}}, {'safe_spaces': (9, 57)},
+                        {'board_size': 40}):
+            with self.assertRaises(ValueError, msg=options):
+                RulesConfig(**options)
+
+    def test_default_config(self):
+        config = RulesConfig()
+        self.assertEqual(config.get_start_spaces(), {'A': 1, 'B': 15, 'C': 29, 'D': 43})
+        self.assertEqual(config.get_end_step(), 57)
+        self.assertEqual(config.get_tokens(), 2)
+
+
+class DefaultRulesTest(unittest.TestCase):
+    """With the default configuration the engine ends every game like LudoGame.play_game."""
+
+    @classmethod
+    def setUpClass(cls):
+        # compiling the tables takes a while, so every game is played by the same engine
+        cls._engine = RulesEngine()
+
+    def _assert_like_ludo_game(self, players, turns):
+        """Check the spaces of the engine and of LudoGame after the turns."""
+        self.assertEqual(self._engine.play_game(players, turns), LudoGame().play_game(players, turns),
+                         (players, turns))
+
+    def test_random_games(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            players = sorted(rng.sample('ABCD', rng.randint(1, 4)))
+            turns = [(rng.choice(players), rng.randint(1, 6)) for _ in range(rng.randint(0, 400))]
+            self._assert_like_ludo_game(players, turns)
+
+    def test_kicks_stacks_and_bounces(self):
+        rng = random.Random(1)
+        for situation in (kicked, stacked, bounced):
+            for players in (['A', 'C'], ['A', 'B', 'C', 'D']):
+                self._assert_like_ludo_game(players, make_biased_turns(players, 150, rng, situation))
+
+    def test_invalid_turns(self):
+        engine = RulesEngine()
+        engine.start_game(['A', 'C'])
+        with self.assertRaises(ValueError):
+            engine.play_turn('B', 6)
+        for roll in (0, 7):
+            with self.assertRaises(ValueError):
+                engine.play_turn('A', roll)
+
+
+class HouseRulesTest(unittest.TestCase):
+    """Other configurations change the board, the tokens and the bounce back."""
+
+    def _short_track(self, bounce_back):
+        """Return an engine of one token on a board of 8 spaces, going 6 steps around it and 2 home squares."""
+        config = RulesConfig(start_spaces={'A': 1, 'C': 5}, board_size=8, track_length=6, home_length=2, tokens=1,
+                             bounce_back=bounce_back)
+        engine = RulesEngine(config.compile())
+        engine.start_game(['A', 'C'])
+        return engine
+
+    def test_bounce_back(self):
+        engine = self._short_track(True)
+        for roll in (6, 6):
+            engine.play_turn('A', roll)
+        # 5 steps from step 6 overshoot 'E' at step 9 by 2
+        self.assertEqual(engine.play_turn('A', 5), 'lower_count')
+        self.assertEqual(engine.get_spaces(), ['A1', 'H'])
+
+    def test_no_bounce_back(self):
+        engine = self._short_track(False)
+        for roll in (6, 6):
+            engine.play_turn('A', roll)
+        self.assertEqual(engine.play_turn('A', 5), 'no_move')
+        self.assertEqual(engine.play_turn('A', 3), 'exact_finish')
+        self.assertTrue(engine.get_completed('A'))
+
+    def test_four_tokens(self):
+        engine = RulesEngine(RulesConfig(tokens=4).compile())
+        spaces = engine.play_game(['A', 'B'], [('A', 6), ('A', 6), ('A', 6), ('B', 6), ('B', 3)])
+        self.assertEqual(spaces, ['R', 'R', 'R', 'H', '17', 'H', 'H', 'H'])
+
+
+if __name__ == '__main__':
+    unittest.main()
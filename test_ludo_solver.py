@@ -0,0 +1,113 @@
+# Author: Hoang Son Nguyen
+# GitHub username: hsnguyen318
+# Description: Tests of the transitions, solved values, cache file and size estimate of the Markov solver
+
+import os
+import random
+import tempfile
+import unittest
+
+from LudoGame import LudoGame, advance_turn, pack_steps, _POSITIONS
+from ludo_solver import MarkovSolver, estimate_states, _BONUS_BIT, _EXPECTED, _PACKED_MASK, _TURN_SHIFT, _VALUES
+
+
+def _reference_next_states(state):
+    """Return the next states of a solver state by playing each roll with LudoGame.priority."""
+    packed = state & _PACKED_MASK
+    turn = state >> _TURN_SHIFT & 3
+    bonus = bool(state & _BONUS_BIT)
+    playing = [pos for index, pos in enumerate(_POSITIONS) if packed >> index & 1]
+    next_states = []
+    for roll in range(1, 7):
+        game = LudoGame()
+        game.set_packed_state(packed)
+        player = game.get_player_by_position(_POSITIONS[turn])
+        game.priority(player, roll)
+        if player.get_completed() is True:
+            next_states.append(-1 - turn)
+            continue
+        next_turn, next_bonus = advance_turn(_POSITIONS, turn, roll, bonus, playing)
+        next_states.append(game.get_packed_state() | next_turn << _TURN_SHIFT | (_BONUS_BIT if next_bonus else 0))
+    return next_states
+
+
+class NextStatesTest(unittest.TestCase):
+    """The transitions read from the decision table are the turns LudoGame.priority plays."""
+
+    def test_random_states(self):
+        rng = random.Random(0)
+        solver = MarkovSolver()
+        checked = 0
+        while checked < 3000:
+            players = sorted(rng.sample(_POSITIONS, rng.randint(1, 4)))
+            steps = {}
+            for pos in players:
+                # mostly on the shared board, some stacked, so kicks and stacks happen
+                steps_p = rng.choice([rng.randint(-1, 57), rng.randint(0, 50)])
+                steps[pos] = (steps_p, steps_p if rng.random() < 0.2 else rng.randint(-1, 57))
+            if any(pos_steps == (57, 57) for pos_steps in steps.values()):
+                continue
+            state = pack_steps(steps) | _POSITIONS.index(rng.choice(players)) << _TURN_SHIFT
+            if rng.random() < 0.3:
+                state |= _BONUS_BIT
+            self.assertEqual(solver._next_states(state), _reference_next_states(state), steps)
+            checked += 1
+
+
+class SolveTest(unittest.TestCase):
+    """Solved values of small endgames, and the cache file they are saved to."""
+
+    def test_endgame_values(self):
+        solver = MarkovSolver()
+        result = solver.solve_packed(pack_steps({'A': (54, 55), 'C': (53, 57)}), 'C')
+        self.assertAlmostEqual(result['win_probabilities']['A'], 0.33764266852174335, places=12)
+        self.assertAlmostEqual(result['win_probabilities']['C'], 0.6623573314782559, places=12)
+        self.assertAlmostEqual(result['expected_turns'], 7.175537757681106, places=10)
+
+    def test_values_average_the_next_states(self):
+        # every solved state satisfies the equations of the chain, whichever way its component was solved
+        solver = MarkovSolver()
+        solver.solve_packed(pack_steps({'A': (45, 50), 'C': (48, 52)}))
+        for state, values in solver._values.items():
+            expected = [0.0] * _VALUES
+            expected[_EXPECTED] = 1.0
+            for next_state in solver._next_states(state):
+                if next_state < 0:
+                    expected[-1 - next_state] += 1 / 6
+                else:
+                    for value in range(_VALUES):
+                        expected[value] += solver._values[next_state][value] / 6
+            for value in range(_VALUES):
+                self.assertAlmostEqual(values[value], expected[value], delta=1e-9 * max(1.0, expected[value]))
+        self.assertAlmostEqual(sum(values[:_EXPECTED]), 1.0, places=12)
+
+    def test_cache_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'solved.bin')
+            packed = pack_steps({'A': (50, 52), 'C': (49, 55)})
+            first = MarkovSolver(path).solve_packed(packed)
+            solver = MarkovSolver(path)
+            self.assertGreater(solver.get_stats()['loaded'], 0)
+            self.assertEqual(solver.solve_packed(packed), first)
+            self.assertEqual(solver.get_stats()['enumerated'], 0)
+
+    def test_cached_states_do_not_count_against_max_states(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'solved.bin')
+            MarkovSolver(path).solve_packed(pack_steps({'A': (46, 50), 'C': (48, 41)}))
+            packed = pack_steps({'A': (44, 50), 'C': (48, 40)})
+            # the bound counts the cached states, the few new ones fit
+            solver = MarkovSolver(path, max_states=2000)
+            self.assertGreater(estimate_states(packed), 2000)
+            solver.solve_packed(packed)
+            self.assertLessEqual(solver.get_stats()['enumerated'], 2000)
+
+    def test_large_position_fails_fast(self):
+        packed = pack_steps({'A': (-1, -1), 'C': (-1, -1)})
+        self.assertGreater(estimate_states(packed), 1000000)
+        with self.assertRaises(ValueError):
+            MarkovSolver(max_states=1000000).solve_packed(packed)
+
+
+if __name__ == '__main__':
+    unittest.main()